@@ -1,3 +1,5 @@
+default_app_config = 'modeltree.apps.ModelTreeConfig'
+
 __version_info__ = {
     'major': 2,
     'minor': 0,
@@ -0,0 +1,25 @@
+import logging
+
+from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModelTreeConfig(AppConfig):
+    name = 'modeltree'
+
+    def ready(self):
+        # Build all trees defined in settings up front rather than on first
+        # use, which also surfaces misconfigured trees at startup.
+        if getattr(settings, 'MODELTREE_PRELOAD', False):
+            from modeltree.tree import trees
+
+            workers = getattr(settings, 'MODELTREE_PRELOAD_WORKERS', None)
+            processes = getattr(settings, 'MODELTREE_PRELOAD_PROCESSES',
+                                False)
+            timings = trees.preload(workers=workers, processes=processes)
+
+            for alias in sorted(timings):
+                logger.info('Built modeltree "%s" in %.3f seconds', alias,
+                            timings[alias])
@@ -0,0 +1,230 @@
+"""Reproducible benchmarks of building trees and using them in queries.
+
+A benchmark times building a tree and resolving, joining and selecting each
+of its models, either for the trees defined in the MODELTREES setting or
+for a synthetic schema, see `create_schema`. Synthetic models are
+registered in an isolated app registry so they never leak into the
+project's registry or require database tables.
+
+The results can be saved as JSON and later compared against, so
+regressions between releases are caught, e.g. using
+``./manage.py modeltree bench --save`` and ``--baseline``.
+"""
+import json
+import math
+import random
+from timeit import default_timer
+
+from django.apps import AppConfig
+from django.apps.registry import Apps
+from django.db import models
+import modeltree
+from modeltree import graph
+from modeltree.tree import ModelTree
+from modeltree.utils import resolve_lookup, lookup_cache
+
+OPERATIONS = ('build', 'resolve_lookup', 'query_string', 'get_joins',
+              'add_select')
+
+PERCENTILES = (50, 90, 99)
+
+
+class SyntheticAppConfig(AppConfig):
+    "App config for a label that has no corresponding module."
+    path = ''
+
+    def __init__(self, label):
+        super(SyntheticAppConfig, self).__init__(label, None)
+
+    def import_models(self, all_models):
+        self.models = all_models
+
+
+def create_registry(app_label='synthetic'):
+    "Returns an isolated app registry with a single synthetic app."
+    return Apps([SyntheticAppConfig(app_label)])
+
+
+def create_model(name, registry, fields, app_label='synthetic'):
+    "Creates a model class named `name` bound to the `registry`."
+    meta = type('Meta', (object,), {
+        'app_label': app_label,
+        'apps': registry,
+    })
+
+    attrs = {
+        '__module__': __name__,
+        'Meta': meta,
+    }
+    attrs.update(fields)
+
+    return type(str(name), (models.Model,), attrs)
+
+
+def create_schema(width, depth, density=0.0, seed=0):
+    """Creates a root model with `depth` levels of `width` models below it
+    and returns the models, root first.
+
+    Each model has a foreign key to a random model of the level above.
+    `density` is the average number of additional relations per model,
+    each a nullable foreign key or a many-to-many to a random model of any
+    level above, which add alternative routes between the models.
+    """
+    registry = create_registry()
+    rand = random.Random(seed)
+    classes = [create_model('Root', registry, {})]
+    levels = [classes[:]]
+
+    for level in range(1, depth + 1):
+        above = [model for level_models in levels for model in level_models]
+        current = []
+
+        for i in range(width):
+            name = 'Level{0}Model{1}'.format(level, i)
+            fields = {
+                'parent': models.ForeignKey(
+                    rand.choice(levels[-1]),
+                    related_name='{0}_parent'.format(name.lower())),
+            }
+
+            count = int(density) + (rand.random() < density % 1)
+
+            for j in range(count):
+                target = rand.choice(above)
+                related_name = '{0}_rel{1}'.format(name.lower(), j)
+
+                if rand.random() < 0.3:
+                    field = models.ManyToManyField(target,
+                                                   related_name=related_name)
+                else:
+                    field = models.ForeignKey(target, null=True,
+                                              related_name=related_name)
+
+                fields['rel{0}'.format(j)] = field
+
+            current.append(create_model(name, registry, fields))
+
+        levels.append(current)
+        classes.extend(current)
+
+    return classes
+
+
+def percentile(samples, percent):
+    "Returns the nearest-rank `percent` percentile of the sorted `samples`."
+    index = int(math.ceil(percent / 100.0 * len(samples))) - 1
+    return samples[max(0, min(index, len(samples) - 1))]
+
+
+def summarize(samples):
+    "Returns the minimum, percentiles and maximum of `samples` in ms."
+    samples = sorted(s * 1000 for s in samples)
+
+    summary = {
+        'min': samples[0],
+        'max': samples[-1],
+    }
+
+    for percent in PERCENTILES:
+        summary['p{0}'.format(percent)] = percentile(samples, percent)
+
+    return summary
+
+
+def benchmark(config, repeat=20, alias=None):
+    """Times each of the `OPERATIONS` `repeat` times on a tree built from
+    `config`, the keyword arguments of `ModelTree`, and returns a dict of
+    the summaries of the samples of each operation, see `summarize`.
+
+    Each sample of an operation other than `build` covers all models of
+    the tree. The relations of the models are cleared before each build
+    and the lookup cache before each resolution, so neither is measured
+    warm.
+    """
+    samples = dict((name, []) for name in OPERATIONS)
+    tree = None
+
+    for i in range(repeat):
+        graph.clear()
+
+        start = default_timer()
+        tree = ModelTree(alias=alias, **config)
+        samples['build'].append(default_timer() - start)
+
+    # Models in the order they are traversed
+    tree_models = sorted(tree._nodes, key=lambda m: tree._nodes[m]['depth'])
+
+    # Fields of the root model cannot be qualified by the model's name
+    paths = [tree.root_model._meta.pk.name]
+    paths.extend('{0}__{1}__{2}'.format(m._meta.app_label, m._meta.model_name,
+                                        m._meta.pk.name)
+                 for m in tree_models[1:])
+
+    fields = [m._meta.pk for m in tree_models]
+
+    for i in range(repeat):
+        lookup_cache.clear()
+
+        start = default_timer()
+        for path in paths:
+            resolve_lookup(path, tree)
+        samples['resolve_lookup'].append(default_timer() - start)
+
+        start = default_timer()
+        for m in tree_models:
+            tree.query_string(m)
+        samples['query_string'].append(default_timer() - start)
+
+        start = default_timer()
+        for m in tree_models:
+            tree.get_joins(m)
+        samples['get_joins'].append(default_timer() - start)
+
+        start = default_timer()
+        tree.add_select(*fields)
+        samples['add_select'].append(default_timer() - start)
+
+    results = dict((name, summarize(s)) for name, s in samples.items())
+    results['models'] = len(tree_models)
+
+    return results
+
+
+def compare(results, baseline, threshold=1.25):
+    """Compares the median of each operation in `results` to `baseline`.
+    Returns a list of (name, operation, baseline, median, ratio) tuples
+    of the operations that are slower than `threshold` times the baseline.
+    Operations missing from either are ignored.
+    """
+    regressions = []
+
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+
+        for operation in OPERATIONS:
+            if operation not in results[name] or \
+                    operation not in baseline[name]:
+                continue
+
+            before = baseline[name][operation]['p50']
+            after = results[name][operation]['p50']
+            ratio = after / before if before else float('inf')
+
+            if ratio > threshold:
+                regressions.append((name, operation, before, after, ratio))
+
+    return regressions
+
+
+def write_results(path, results):
+    with open(path, 'w') as f:
+        json.dump({
+            'version': modeltree.__version__,
+            'results': results,
+        }, f, indent=4, sort_keys=True)
+
+
+def read_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
@@ -0,0 +1,103 @@
+"""The relations between models, shared by all trees.
+
+Finding the relations of a model requires introspecting all of its fields.
+The relations only depend on the installed models, so they are determined
+once per model and shared by the trees of all root models. Each tree only
+applies its own routes when traversing them, see `ModelTree._join_allowed`.
+
+The relations are cached per app registry and the cache of a registry is
+cleared whenever a model is added to it, since the new model may add
+reverse relations to existing models.
+"""
+from collections import namedtuple
+
+from django.db.models.signals import class_prepared
+
+# A relation from a model to `model`. `join` is the (source, target, field)
+# tuple a route must allow for the relation to be traversed.
+Relation = namedtuple('Relation', ('model', 'relation', 'reverse',
+                                   'related_name', 'accessor_name',
+                                   'nullable', 'join'))
+
+_graphs = {}
+
+
+def _get_relation_type(f):
+    if f.one_to_one:
+        return 'onetone'
+    elif f.many_to_many:
+        return 'manytomany'
+    elif f.one_to_many or f.many_to_one:
+        return 'foreignkey'
+
+
+def _find_relations(model):
+    # NOTE: the many-to-many relations are evaluated first to prevent
+    # 'through' models being bound as a ForeignKey relationship.
+    fields = sorted(model._meta.get_fields(), reverse=True,
+                    key=lambda f: f.many_to_many)
+
+    relations = []
+
+    # Forward relations
+    for f in fields:
+        if (f.one_to_one or f.many_to_many or f.many_to_one) \
+                and (f.concrete or not f.auto_created) \
+                and f.rel is not None:  # Generic foreign keys define no rel.
+            relations.append(Relation(
+                model=f.rel.to,
+                relation=_get_relation_type(f),
+                reverse=False,
+                related_name=f.name,
+                accessor_name=f.name,
+                nullable=f.many_to_many or f.null,
+                join=(f.model, f.rel.to, f),
+            ))
+
+    # Reverse relations
+    for r in fields:
+        if (r.one_to_many or r.one_to_one or r.many_to_many) \
+                and (not r.concrete and r.auto_created):
+            relations.append(Relation(
+                model=r.related_model,
+                relation=_get_relation_type(r),
+                reverse=True,
+                related_name=r.field.related_query_name(),
+                accessor_name=r.get_accessor_name(),
+                nullable=True,
+                join=(r.model, r.related_model, r.field),
+            ))
+
+    return tuple(relations)
+
+
+def get_relations(model):
+    """Returns the forward and reverse relations of `model` in the order
+    they are traversed, as a tuple of `Relation`s.
+    """
+    graph = _graphs.get(model._meta.apps)
+
+    if graph is None:
+        graph = _graphs.setdefault(model._meta.apps, {})
+
+    relations = graph.get(model)
+
+    if relations is None:
+        relations = graph[model] = _find_relations(model)
+
+    return relations
+
+
+def clear(registry=None):
+    "Clears the relations of all models or only those of `registry`."
+    if registry is None:
+        _graphs.clear()
+    else:
+        _graphs.pop(registry, None)
+
+
+def _model_prepared(sender, **kwargs):
+    clear(sender._meta.apps)
+
+
+class_prepared.connect(_model_prepared)
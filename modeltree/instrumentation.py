@@ -0,0 +1,99 @@
+"""Opt-in timers and counters for the hot paths of building trees, resolving
+lookups and applying joins.
+
+Instrumentation is disabled unless the ``MODELTREE_INSTRUMENTATION`` setting
+is true. While it is disabled, an instrumented function only checks a flag
+before calling through, so the functions are left instrumented at all times.
+
+Each timed call sends the `timed` signal with the name of the function and
+its duration in seconds, so the numbers can be fed to external exporters,
+and is aggregated in process, see `get_stats`.
+"""
+import threading
+from functools import wraps
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from modeltree.signals import timed
+
+_enabled = bool(getattr(settings, 'MODELTREE_INSTRUMENTATION', False))
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def record(name, duration):
+    "Records a call of `name` which took `duration` seconds."
+    with _lock:
+        stats = _stats.get(name)
+
+        if stats is None:
+            _stats[name] = [1, duration, duration]
+        else:
+            stats[0] += 1
+            stats[1] += duration
+
+            if duration > stats[2]:
+                stats[2] = duration
+
+    timed.send(sender=None, name=name, duration=duration)
+
+
+def instrument(name):
+    """Decorator which times the calls of the decorated function under
+    `name` while instrumentation is enabled.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            start = default_timer()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, default_timer() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def get_stats():
+    """Returns a dict of the number of calls, and the total and maximum
+    time in seconds of each instrumented function that has been called.
+    """
+    with _lock:
+        return dict((name, {'count': count, 'total': total, 'max': maximum})
+                    for name, (count, total, maximum) in _stats.items())
+
+
+def reset():
+    "Clears the collected stats."
+    with _lock:
+        _stats.clear()
+
+
+@receiver(setting_changed)
+def _setting_changed(sender, setting, value, **kwargs):
+    if setting == 'MODELTREE_INSTRUMENTATION':
+        global _enabled
+        _enabled = bool(value)
@@ -9,7 +9,10 @@ class Command(BaseCommand):
     help = "A wrapper for modeltree subcommands"
 
     commands = {
+        'bench': 'bench',
         'preview': 'preview',
+        'snapshot': 'snapshot',
+        'stats': 'stats',
     }
 
     def print_subcommands(self, prog_name):
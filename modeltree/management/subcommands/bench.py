@@ -0,0 +1,139 @@
+from optparse import make_option
+from django.conf import settings
+from django.core.management import CommandError
+from django.core.management.base import BaseCommand
+from modeltree import bench
+
+
+class Command(BaseCommand):
+    """
+    SYNOPSIS::
+
+        python manage.py modeltree bench [options] [alias [alias ...]]
+
+    DESCRIPTION:
+
+        Times building the ModelTrees defined in the MODELTREES setting and
+        resolving, joining and selecting each of their models, and prints
+        the percentiles of each in milliseconds. If no aliases are given,
+        all defined ModelTrees are benchmarked.
+
+    OPTIONS:
+
+        ``--synthetic`` - Benchmark the tree of a synthetic schema instead
+        of the defined ModelTrees, see ``--width``, ``--depth``,
+        ``--density`` and ``--seed``.
+
+        ``--repeat`` - The number of times each operation is timed.
+
+        ``--save`` - Writes the results as JSON to the given file.
+
+        ``--baseline`` - Compares the results to those saved in the given
+        file and fails if the median of any operation is slower than
+        ``--threshold`` times the baseline.
+
+    """
+
+    help = 'Benchmarks the ModelTrees defined in settings.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--synthetic', action='store_true', dest='synthetic',
+                    default=False,
+                    help='Benchmark a synthetic schema.'),
+        make_option('--width', action='store', dest='width', type='int',
+                    default=10,
+                    help='Number of models per level of the synthetic '
+                         'schema.'),
+        make_option('--depth', action='store', dest='depth', type='int',
+                    default=4,
+                    help='Number of levels of the synthetic schema.'),
+        make_option('--density', action='store', dest='density',
+                    type='float', default=0.5,
+                    help='Average number of additional relations per '
+                         'model of the synthetic schema.'),
+        make_option('--seed', action='store', dest='seed', type='int',
+                    default=0,
+                    help='Random seed of the synthetic schema.'),
+        make_option('--repeat', action='store', dest='repeat', type='int',
+                    default=20,
+                    help='Number of times each operation is timed.'),
+        make_option('--save', action='store', dest='save', default=None,
+                    help='File the results are written to.'),
+        make_option('--baseline', action='store', dest='baseline',
+                    default=None,
+                    help='File of saved results to compare against.'),
+        make_option('--threshold', action='store', dest='threshold',
+                    type='float', default=1.25,
+                    help='Ratio to the baseline considered a regression.'),
+    )
+
+    def get_configs(self, aliases, options):
+        "Returns a list of names and `ModelTree` arguments to benchmark."
+        if options['synthetic']:
+            name = 'synthetic(width={0},depth={1},density={2},seed={3})' \
+                .format(options['width'], options['depth'],
+                        options['density'], options['seed'])
+            schema = bench.create_schema(options['width'], options['depth'],
+                                         options['density'], options['seed'])
+            return [(name, None, {'model': schema[0]})]
+
+        modeltrees = getattr(settings, 'MODELTREES', {})
+
+        if not aliases:
+            aliases = sorted(modeltrees)
+
+        for alias in aliases:
+            if alias not in modeltrees:
+                raise CommandError('No modeltree settings defined for "{0}"'
+                                   .format(alias))
+
+        return [(alias, alias, modeltrees[alias]) for alias in aliases]
+
+    def handle(self, *aliases, **options):
+        baseline = None
+
+        if options.get('baseline'):
+            try:
+                baseline = bench.read_results(options['baseline'])
+            except (IOError, ValueError, KeyError) as e:
+                raise CommandError('The baseline could not be read: {0}'
+                                   .format(e))
+
+        results = {}
+
+        for name, alias, config in self.get_configs(aliases, options):
+            results[name] = bench.benchmark(config, repeat=options['repeat'],
+                                            alias=alias)
+
+            self.stdout.write('{0} ({1} models)'.format(
+                name, results[name]['models']))
+
+            self.stdout.write('    {0:<16} {1:>10} {2:>10} {3:>10} {4:>10}'
+                              .format('operation', 'p50 (ms)', 'p90 (ms)',
+                                      'p99 (ms)', 'max (ms)'))
+
+            for operation in bench.OPERATIONS:
+                s = results[name][operation]
+                self.stdout.write('    {0:<16} {1:>10.3f} {2:>10.3f} '
+                                  '{3:>10.3f} {4:>10.3f}'
+                                  .format(operation, s['p50'], s['p90'],
+                                          s['p99'], s['max']))
+
+        if options.get('save'):
+            bench.write_results(options['save'], results)
+            self.stdout.write('Wrote results to {0}'.format(options['save']))
+
+        if baseline is not None:
+            regressions = bench.compare(results, baseline,
+                                        options['threshold'])
+
+            for name, operation, before, after, ratio in regressions:
+                self.stdout.write('{0} {1}: {2:.3f} ms -> {3:.3f} ms '
+                                  '({4:.2f}x)'.format(name, operation,
+                                                      before, after, ratio))
+
+            if regressions:
+                raise CommandError('{0} operation(s) regressed compared to '
+                                   'the baseline.'.format(len(regressions)))
+
+            self.stdout.write('No regressions compared to the baseline.')
@@ -0,0 +1,61 @@
+from optparse import make_option
+from django.conf import settings
+from django.core.management import CommandError
+from django.core.management.base import BaseCommand
+from modeltree import snapshots
+from modeltree.tree import ModelTree
+
+
+class Command(BaseCommand):
+    """
+    SYNOPSIS::
+
+        python manage.py modeltree snapshot [options] [alias [alias ...]]
+
+    DESCRIPTION:
+
+        Builds the ModelTrees defined in the MODELTREES setting and writes
+        a snapshot of each, so they do not need to be built when they are
+        first accessed. If no aliases are given, all defined ModelTrees are
+        written.
+
+    OPTIONS:
+
+        ``--directory`` - The directory the snapshots are written to.
+        Defaults to the MODELTREE_SNAPSHOT_DIR setting.
+
+    """
+
+    help = 'Writes snapshots of the ModelTrees defined in settings.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--directory', action='store', dest='directory',
+                    default=None,
+                    help='Directory the snapshots are written to.'),
+    )
+
+    def handle(self, *aliases, **options):
+        directory = options.get('directory') or snapshots.get_snapshot_dir()
+
+        if not directory:
+            raise CommandError('No snapshot directory specified. Set '
+                               'MODELTREE_SNAPSHOT_DIR or use --directory.')
+
+        modeltrees = getattr(settings, 'MODELTREES', {})
+
+        if not aliases:
+            aliases = sorted(modeltrees)
+
+        for alias in aliases:
+            if alias not in modeltrees:
+                raise CommandError('No modeltree settings defined for "{0}"'
+                                   .format(alias))
+
+            config = modeltrees[alias]
+            tree = ModelTree(alias=alias, **config)
+
+            path = snapshots.write_snapshot(alias, config, tree.serialize(),
+                                            directory=directory)
+
+            self.stdout.write('Wrote snapshot for "{0}" to {1}'
+                              .format(alias, path))
@@ -0,0 +1,78 @@
+from optparse import make_option
+from django.conf import settings
+from django.core.management import CommandError
+from django.core.management.base import BaseCommand
+from modeltree import instrumentation
+from modeltree.tree import ModelTree
+from modeltree.utils import lookup_cache
+
+
+class Command(BaseCommand):
+    """
+    SYNOPSIS::
+
+        python manage.py modeltree stats [options] [alias [alias ...]]
+
+    DESCRIPTION:
+
+        Builds the ModelTrees defined in the MODELTREES setting with
+        instrumentation enabled and prints the number of calls, and the
+        total, mean and maximum time of each instrumented function. If no
+        aliases are given, all defined ModelTrees are built.
+
+    OPTIONS:
+
+        ``--no-build`` - Only print the stats collected so far in this
+        process, without building any trees.
+
+    """
+
+    help = 'Prints the stats of building the ModelTrees defined in settings.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--no-build', action='store_false', dest='build',
+                    default=True,
+                    help='Do not build any trees before printing the stats.'),
+    )
+
+    def handle(self, *aliases, **options):
+        if options.get('build', True):
+            modeltrees = getattr(settings, 'MODELTREES', {})
+
+            if not aliases:
+                aliases = sorted(modeltrees)
+
+            for alias in aliases:
+                if alias not in modeltrees:
+                    raise CommandError('No modeltree settings defined for '
+                                       '"{0}"'.format(alias))
+
+            enabled = instrumentation.is_enabled()
+            instrumentation.enable()
+
+            try:
+                for alias in aliases:
+                    ModelTree(alias=alias, **modeltrees[alias])
+            finally:
+                if not enabled:
+                    instrumentation.disable()
+
+        stats = instrumentation.get_stats()
+
+        self.stdout.write('{0:<20} {1:>10} {2:>12} {3:>12} {4:>12}'
+                          .format('name', 'calls', 'total (ms)', 'mean (ms)',
+                                  'max (ms)'))
+
+        for name in sorted(stats):
+            s = stats[name]
+            self.stdout.write('{0:<20} {1:>10} {2:>12.3f} {3:>12.3f} '
+                              '{4:>12.3f}'.format(name, s['count'],
+                                                  s['total'] * 1000,
+                                                  s['total'] / s['count'] *
+                                                  1000,
+                                                  s['max'] * 1000))
+
+        info = lookup_cache.info()
+        self.stdout.write('lookup cache: {0} hits, {1} misses, {2}/{3} '
+                          'entries'.format(info['hits'], info['misses'],
+                                           info['size'], info['maxsize']))
@@ -1,14 +1,107 @@
-from django.db.models import query
-from modeltree.tree import trees
+import uuid
+from array import array
+from collections import OrderedDict
+
+from django.db.models import Q, query
+from django.db.models.expressions import Col
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
+from django.db.models.sql.datastructures import EmptyResultSet
+from modeltree.tree import trees, ModelTree
 from modeltree.utils import M
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Array type codes of the fields stored in `array.array` columns
+ARRAY_TYPECODES = {
+    'AutoField': 'l',
+    'BigIntegerField': 'l',
+    'IntegerField': 'l',
+    'PositiveIntegerField': 'l',
+    'PositiveSmallIntegerField': 'l',
+    'SmallIntegerField': 'l',
+    'FloatField': 'd',
+}
+
+
+def _fetch_chunks(connection, sql, params, col_count, chunk_size,
+                  server_side):
+    if server_side and connection.vendor == 'postgresql':
+        connection.ensure_connection()
+
+        # Named cursors must be held open outside of a transaction
+        cursor = connection.connection.cursor(
+            name='modeltree_{0}'.format(uuid.uuid4().hex),
+            withhold=connection.get_autocommit())
+        cursor.itersize = chunk_size
+    else:
+        cursor = connection.cursor()
+
+    try:
+        cursor.execute(sql, params)
+
+        empty = connection.features.empty_fetchmany_value
+
+        for rows in iter(lambda: cursor.fetchmany(chunk_size), empty):
+            yield [row[:col_count] for row in rows]
+    finally:
+        cursor.close()
+
+
+def _get_column(expression):
+    "Returns an empty column for the values of `expression`."
+    field = getattr(expression, 'output_field', None)
+
+    # Use the type of the field foreign keys refer to
+    while field is not None and field.is_relation:
+        field = field.foreign_related_fields[0]
+
+    if field is not None:
+        typecode = ARRAY_TYPECODES.get(field.get_internal_type())
+
+        if typecode:
+            return array(typecode)
+
+    return []
+
+
+def _extend_column(column, values):
+    "Extends `column` by `values` and returns it."
+    if isinstance(column, array):
+        size = len(column)
+
+        try:
+            column.extend(values)
+            return column
+        except (TypeError, OverflowError):
+            # Nulls and values not fitting the type code
+            column = column.tolist()[:size]
+
+    column.extend(values)
+    return column
+
+
+def _to_numpy(column):
+    if isinstance(column, array):
+        return numpy.frombuffer(column, dtype=column.typecode)
+    return numpy.array(column, dtype=object)
+
 
 class ModelTreeQuerySet(query.QuerySet):
     def __init__(self, model=None, *args, **kwargs):
-        self.tree = trees[model]
+        # Clones pass the tree itself, which does not need to be looked up
+        if isinstance(model, ModelTree):
+            self.tree = model
+        else:
+            self.tree = trees[model]
         model = self.tree.root_model
         super(ModelTreeQuerySet, self).__init__(model, *args, **kwargs)
 
+        # The lookups of the columns selected with `select()`
+        self._select_lookups = None
+
     # Override to ensure no additional modeltrees are created during clone
     def _clone(self, klass=None, setup=False, **kwargs):
         if klass is None:
@@ -29,6 +122,7 @@ class ModelTreeQuerySet(query.QuerySet):
 
         c._for_write = self._for_write
         c._prefetch_related_lookups = self._prefetch_related_lookups[:]
+        c._select_lookups = self._select_lookups
         c.__dict__.update(kwargs)
 
         if setup and hasattr(c, '_setup_query'):
@@ -41,9 +135,235 @@ class ModelTreeQuerySet(query.QuerySet):
             ._filter_or_exclude(negate, M(self.tree, *args, **kwargs))
 
     def select(self, *fields, **kwargs):
-        queryset = self._clone()
-        return self.tree.add_select(queryset=queryset, *fields, **kwargs)
+        include_pk = kwargs.get('include_pk', True)
+
+        # The queryset is cloned by the tree
+        queryset = self.tree.add_select(queryset=self, *fields, **kwargs)
+
+        # Name the columns after the lookups of their fields
+        lookups = []
+
+        if include_pk:
+            lookups.append(self.tree.query_string_for_field(
+                self.tree.root_model._meta.pk))
+
+        for pair in fields:
+            if isinstance(pair, (list, tuple)):
+                model, field = pair
+            else:
+                model, field = None, pair
+
+            lookups.append(self.tree.query_string_for_field(field,
+                                                            model=model))
+
+        queryset._select_lookups = lookups
+
+        return queryset
 
     def raw(self):
         compiler = self.query.get_compiler(self.db)
         return compiler.results_iter()
+
+    def _get_column_names(self, compiler):
+        names = []
+
+        for expression, sql, alias in compiler.select[:compiler.col_count]:
+            if alias:
+                names.append(alias)
+            elif hasattr(expression, 'target'):
+                names.append(expression.target.attname)
+            else:
+                names.append(str(expression))
+
+        # The columns of `select()` follow those of `extra(select=...)`.
+        # Other columns, e.g. annotations, keep their names.
+        if self._select_lookups is not None:
+            start = len(compiler.query.extra_select)
+            end = start + len(self._select_lookups)
+            names[start:end] = self._select_lookups
+
+        return names
+
+    def column_names(self):
+        """Returns the names of the columns of the raw rows. Columns selected
+        with `select()` are named by their lookups relative to the root
+        model, other columns by their field names or aliases.
+        """
+        compiler = self.query.get_compiler(self.db)
+        compiler.setup_query()
+        return self._get_column_names(compiler)
+
+    def _fetch(self, compiler, chunk_size, server_side):
+        """Compiles the query and returns an iterator over lists of up to
+        `chunk_size` rows or `None` if the query has no results. The cursor
+        is only opened once the iteration starts.
+        """
+        try:
+            sql, params = compiler.as_sql()
+        except EmptyResultSet:
+            return
+
+        if not sql:
+            return
+
+        return _fetch_chunks(compiler.connection, sql, params,
+                             compiler.col_count, chunk_size, server_side)
+
+    def stream(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False,
+               named=False):
+        """Iterates over the raw rows of this queryset like `raw()`, but only
+        fetches `chunk_size` rows from the cursor at a time, so memory use
+        does not depend on the number of rows.
+
+        `server_side` - use a server-side cursor, so the database only sends
+        `chunk_size` rows at a time rather than the whole result. This is
+        only supported on PostgreSQL, other backends use a regular cursor.
+
+        `named` - yield dicts keyed by the `column_names()` rather than
+        tuples.
+
+        Unlike `raw()` the rows are also read in chunks on SQLite, where the
+        rows being iterated over must not be modified until the iteration is
+        done.
+        """
+        compiler = self.query.get_compiler(self.db)
+        chunks = self._fetch(compiler, chunk_size, server_side)
+
+        if chunks is None:
+            return
+
+        if not named:
+            for row in compiler.results_iter(results=chunks):
+                yield row
+            return
+
+        names = self._get_column_names(compiler)
+
+        for row in compiler.results_iter(results=chunks):
+            yield dict(zip(names, row))
+
+    def columns(self, chunk_size=GET_ITERATOR_CHUNK_SIZE, server_side=False):
+        """Fetches the rows of this queryset column by column and returns an
+        ordered dict of the `column_names()` and their values. See `stream()`
+        for the arguments.
+
+        The values of integer and float columns are stored in `array.array`s,
+        other columns and columns containing nulls in lists. When NumPy is
+        installed, NumPy arrays are returned instead.
+        """
+        compiler = self.query.get_compiler(self.db)
+        chunks = self._fetch(compiler, chunk_size, server_side)
+
+        if chunks is None:
+            compiler.setup_query()
+            chunks = ()
+
+        expressions = [s[0] for s in compiler.select[:compiler.col_count]]
+        converters = compiler.get_converters(expressions)
+
+        columns = [_get_column(expression) for expression in expressions]
+
+        for rows in chunks:
+            for i, values in enumerate(zip(*rows)):
+                if i in converters:
+                    convs, expression = converters[i]
+
+                    for converter in convs:
+                        values = [converter(value, expression,
+                                            compiler.connection,
+                                            compiler.query.context)
+                                  for value in values]
+
+                columns[i] = _extend_column(columns[i], values)
+
+        if numpy is not None:
+            columns = [_to_numpy(column) for column in columns]
+
+        return OrderedDict(zip(self._get_column_names(compiler), columns))
+
+    def _get_pk_index(self, compiler):
+        """Returns the index of the primary key of the root model in the rows
+        of the set up `compiler` or `None` if it is not selected.
+        """
+        pk = self.model._meta.pk
+        alias = compiler.query.get_initial_alias()
+
+        for i, (expression, sql, _) in \
+                enumerate(compiler.select[:compiler.col_count]):
+            if getattr(expression, 'target', None) is pk and \
+                    expression.alias == alias:
+                return i
+
+    def pages(self, page_size=GET_ITERATOR_CHUNK_SIZE):
+        """Iterates over the raw rows of this queryset in pages of up to
+        `page_size` rows, ordered by the primary key of the root model.
+
+        Rather than by an offset, each page is fetched by a single query for
+        the rows following the last key of the previous page, so every page
+        takes the same time to fetch. Joins to many-to-many relations may
+        result in several rows per root instance. The rows of an instance
+        are never split across pages, so a page may contain fewer rows, or
+        more if an instance has more than `page_size` rows.
+        """
+        if not self.query.can_filter():
+            raise TypeError('Cannot paginate a query once a slice has been '
+                            'taken.')
+
+        queryset = self.order_by('pk')
+
+        compiler = queryset.query.get_compiler(queryset.db)
+        compiler.setup_query()
+        index = self._get_pk_index(compiler)
+        added = index is None
+
+        # The primary key is selected for the bounds of the pages, but not
+        # returned unless it was selected already.
+        if added:
+            alias = queryset.query.get_initial_alias()
+            pk = self.model._meta.pk
+            queryset.query.select = list(queryset.query.select) + \
+                [Col(alias, pk, pk)]
+            index = len(compiler.query.extra_select) + \
+                len(queryset.query.select) - 1
+
+        last = None
+
+        while True:
+            page = queryset._clone()
+
+            # The conditions are added to the query directly, since they
+            # are relative to the root model rather than the tree.
+            if last is not None:
+                page.query.add_q(Q(pk__gt=last))
+
+            # One more row is fetched to tell whether the rows of the last
+            # instance continue on the next page.
+            page.query.set_limits(high=page_size + 1)
+            rows = list(page.raw())
+            done = len(rows) <= page_size
+
+            if not done:
+                last = rows[page_size - 1][index]
+
+                if rows[page_size][index] == last:
+                    rows = [row for row in rows[:page_size]
+                            if row[index] != last]
+
+                    # A single instance has more rows than fit in a page
+                    if not rows:
+                        page = queryset._clone()
+                        page.query.add_q(Q(pk=last))
+                        rows = list(page.raw())
+
+                    last = rows[-1][index]
+                else:
+                    rows = rows[:page_size]
+
+            if added:
+                rows = [row[:index] + row[index + 1:] for row in rows]
+
+            if rows:
+                yield rows
+
+            if done:
+                return
@@ -0,0 +1,12 @@
+from django.dispatch import Signal
+
+# Sent when `LazyModelTrees` creates a tree for an alias, replacing any tree
+# previously created for the same alias.
+tree_created = Signal(providing_args=['alias', 'tree'])
+
+# Sent when the rules of a tree are changed with `ModelTree.update`.
+tree_updated = Signal(providing_args=['alias', 'tree'])
+
+# Sent for each call of an instrumented function while instrumentation is
+# enabled, see `modeltree.instrumentation`.
+timed = Signal(providing_args=['name', 'duration'])
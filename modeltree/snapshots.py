@@ -0,0 +1,179 @@
+"""Persisted snapshots of built `ModelTree` instances.
+
+Building a tree requires traversing the relations of every reachable model.
+To avoid doing this in every process, the serialized form of a tree (see
+`ModelTree.serialize`) can be written to disk ahead of time, e.g. using
+``./manage.py modeltree snapshot``, and read back when the tree is first
+accessed.
+
+Snapshots are stored as JSON files in the ``MODELTREE_SNAPSHOT_DIR``
+directory, one per alias. Each snapshot is keyed by a fingerprint of the
+installed models and the tree's settings, so a snapshot is ignored as soon
+as either of them changes.
+"""
+import errno
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+
+from django.apps import apps
+from django.conf import settings
+import modeltree
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+_schema_fingerprint = None
+
+# The umask can only be read by setting it, which affects every thread, so
+# it is read once when the module is imported.
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+def _get_label(model):
+    return '{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+
+
+def _json_default(obj):
+    # Model classes may be used in place of labels in the settings
+    if isinstance(obj, type) and hasattr(obj, '_meta'):
+        return _get_label(obj)
+
+    # Other classes and functions are identified by their dotted path, since
+    # their representation may contain an address which changes between
+    # processes.
+    if isinstance(obj, type) or inspect.isfunction(obj):
+        return '{0}.{1}'.format(obj.__module__, obj.__name__)
+
+    if isinstance(obj, (set, frozenset)):
+        return sorted(json.dumps(o, sort_keys=True, default=_json_default)
+                      for o in obj)
+
+    raise TypeError('{0!r} cannot be fingerprinted'.format(obj))
+
+
+def get_schema_fingerprint():
+    """Returns a hex digest of the installed models and their fields.
+    Since the installed models cannot change during the lifetime of a
+    process, this is only computed once.
+    """
+    global _schema_fingerprint
+
+    if _schema_fingerprint is None:
+        parts = [modeltree.__version__]
+
+        for model in sorted(apps.get_models(), key=_get_label):
+            parts.append(_get_label(model))
+
+            for f in model._meta.get_fields(include_hidden=True):
+                related = ''
+                accessor = ''
+
+                if f.is_relation and f.related_model is not None:
+                    related = _get_label(f.related_model)
+
+                    if f.auto_created and not f.concrete:
+                        accessor = f.get_accessor_name() or ''
+
+                parts.append(' '.join((f.name, f.__class__.__name__, related,
+                                       accessor, str(getattr(f, 'null',
+                                                             None)))))
+
+        digest = hashlib.sha1('\n'.join(parts).encode('utf-8'))
+        _schema_fingerprint = digest.hexdigest()
+
+    return _schema_fingerprint
+
+
+def get_fingerprint(config):
+    """Returns a hex digest of the installed models and the tree `config`.
+    Raises a `TypeError` if `config` contains a value which cannot be
+    fingerprinted.
+    """
+    digest = hashlib.sha1(get_schema_fingerprint().encode('utf-8'))
+    digest.update(json.dumps(config, sort_keys=True,
+                             default=_json_default).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_snapshot_dir():
+    return getattr(settings, 'MODELTREE_SNAPSHOT_DIR', None)
+
+
+def get_snapshot_path(alias, directory=None):
+    if directory is None:
+        directory = get_snapshot_dir()
+    return os.path.join(directory, '{0}.json'.format(alias))
+
+
+def write_snapshot(alias, config, data, directory=None):
+    """Writes the serialized tree `data` for `alias` which was built from
+    `config`. Returns the path of the snapshot.
+    """
+    path = get_snapshot_path(alias, directory)
+
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'fingerprint': get_fingerprint(config),
+        'tree': data,
+    }
+
+    # Write to a temporary file first, so concurrently starting processes
+    # never read a partially written snapshot.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+
+    try:
+        # Temporary files are only readable by their owner, but snapshots
+        # are usually read by other users, e.g. those of app servers.
+        os.fchmod(fd, 0o644 & ~_umask)
+
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+
+        os.rename(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    return path
+
+
+def read_snapshot(alias, config, directory=None):
+    """Returns the serialized tree for `alias` if a snapshot exists and
+    matches the fingerprint of `config`, otherwise `None`.
+    """
+    if directory is None:
+        directory = get_snapshot_dir()
+
+    if not directory:
+        return
+
+    path = get_snapshot_path(alias, directory)
+
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except IOError as e:
+        if e.errno != errno.ENOENT:
+            logger.warning('The snapshot %s could not be read: %s', path, e)
+        return
+    except ValueError as e:
+        logger.warning('The snapshot %s is invalid: %s', path, e)
+        return
+
+    try:
+        fingerprint = get_fingerprint(config)
+    except TypeError as e:
+        logger.warning('The snapshot %s cannot be used: %s', path, e)
+        return
+
+    if snapshot.get('version') != SNAPSHOT_VERSION or \
+            snapshot.get('fingerprint') != fingerprint:
+        return
+
+    return snapshot['tree']
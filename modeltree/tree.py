@@ -1,5 +1,13 @@
 import inspect
+import threading
+import time
 import warnings
+from collections import deque
+from contextlib import contextmanager
+from copy import copy
+from functools import partial
+from multiprocessing import cpu_count
+from multiprocessing.pool import Pool, ThreadPool
 
 from django.apps import apps
 from django.db import models
@@ -10,6 +18,9 @@ from django.db.models.expressions import Col
 from django.db.models.sql.constants import INNER, LOUTER
 from django.db.models.sql.datastructures import Join, BaseTable
 from django.utils.datastructures import MultiValueDict
+from modeltree import graph, snapshots
+from modeltree.instrumentation import instrument
+from modeltree.signals import tree_created, tree_updated
 
 __all__ = ('ModelTree',)
 
@@ -17,6 +28,10 @@ __all__ = ('ModelTree',)
 MODELTREE_DEFAULT_ALIAS = 'default'
 
 
+def _get_model_label(model):
+    return '{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+
+
 class ModelTreeError(Exception):
     pass
 
@@ -37,7 +52,31 @@ class ModelNotRelated(ModelLookupError):
     pass
 
 
+# The shared names of each model, see `_get_model_names`
+_model_name_cache = {}
+
+
+def _get_model_names(model):
+    """Returns the shared app label, object name, table name and primary key
+    column of `model`."""
+    names = _model_name_cache.get(model)
+
+    if names is None:
+        opts = model._meta
+        names = _model_name_cache.setdefault(model, (
+            opts.app_label, opts.object_name, opts.db_table, opts.pk.column))
+
+    return names
+
+
 class ModelTreeNode(object):
+    # Trees of every root model are kept for the lifetime of the process, so
+    # the nodes do not carry an instance dictionary.
+    __slots__ = ('model', 'app_name', 'model_name', 'db_table', 'pk_column',
+                 'parent', 'parent_model', 'relation', 'reverse',
+                 'related_name', 'accessor_name', 'nullable', 'depth',
+                 'children')
+
     def __init__(self, model, parent=None, relation=None, reverse=None,
                  related_name=None, accessor_name=None, nullable=False,
                  depth=0):
@@ -73,10 +112,8 @@ class ModelTreeNode(object):
 
         self.model = model
 
-        self.app_name = model._meta.app_label
-        self.model_name = model._meta.object_name
-        self.db_table = model._meta.db_table
-        self.pk_column = model._meta.pk.column
+        self.app_name, self.model_name, self.db_table, self.pk_column = \
+            _get_model_names(model)
 
         self.parent = parent
         self.parent_model = parent and parent.model or None
@@ -91,6 +128,14 @@ class ModelTreeNode(object):
 
         self.children = []
 
+    def __getstate__(self):
+        # Objects with slots cannot be pickled with the default protocol
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __str__(self):
         name = 'ModelTreeNode: {0}'.format(self.model_name)
 
@@ -246,6 +291,33 @@ class ModelTree(object):
 
     """
     def __init__(self, model=None, **kwargs):
+        self._configure(model, **kwargs)
+        self._build()
+
+    @classmethod
+    def build_many(cls, configs):
+        """Builds a tree for each dict of keyword arguments in `configs` and
+        returns them in the same order.
+
+        Trees with the same excluded models and routes share the relations
+        allowed by them, so the relations of each model are only filtered
+        once rather than once per tree.
+        """
+        relations = {}
+        trees = []
+
+        for kwargs in configs:
+            tree = cls.__new__(cls)
+            tree._configure(**kwargs)
+            tree._relations = relations.setdefault(tree._get_rules_key(),
+                                                   tree._relations)
+            tree._build()
+            trees.append(tree)
+
+        return trees
+
+    def _configure(self, model=None, **kwargs):
+        "Sets up the root model and rules of the tree from the settings."
         if model is None and 'root_model' in kwargs:
             warnings.warn('The "root_model" key has been renamed to "model"',
                           DeprecationWarning)
@@ -275,20 +347,55 @@ class ModelTree(object):
         self.alias = kwargs.get('alias', None)
 
         # Models completely excluded from the tree
-        self.excluded_models = [self.get_model(label, local=False)
-                                for label in excluded_models]
+        excluded_models = [self.get_model(label, local=False)
+                           for label in excluded_models]
 
         # Build the routes that are allowed/preferred
-        self._required_joins = self._build_routes(
-            required_routes,
-            allow_redundant_targets=False)
+        required_joins = self._build_routes(required_routes,
+                                            allow_redundant_targets=False)
 
         # Build the routes that are excluded
-        self._excluded_joins = self._build_routes(excluded_routes)
+        excluded_joins = self._build_routes(excluded_routes)
+
+        self._setup(excluded_models, required_joins, excluded_joins)
+
+    def _setup(self, excluded_models, required_joins, excluded_joins):
+        "Sets up the routing rules and empty caches prior to building."
+        self._set_rules(excluded_models, required_joins, excluded_joins)
 
         # cache each node relative their models
         self._nodes = {}
 
+        self._clear_indexes()
+
+    def _set_rules(self, excluded_models, required_joins, excluded_joins):
+        "Sets the excluded models and routes."
+        self.excluded_models = set(excluded_models)
+
+        self._required_joins = required_joins
+
+        # Index the required routes by target. A model can only be the target
+        # of a single required route, so a join to it can be checked against
+        # its source and field directly.
+        self._required_targets = dict(
+            (target, (source, field))
+            for (source, target), field in self._required_joins.items())
+
+        self._excluded_joins = excluded_joins
+
+        # cache the relations of each model allowed by the rules. these do
+        # not depend on the root model, so they may be shared by trees with
+        # the same rules, see `build_many`.
+        self._relations = {}
+
+    def _get_rules_key(self):
+        "Returns a hashable representation of the rules of the tree."
+        return (frozenset(self.excluded_models),
+                frozenset(self._required_joins.items()),
+                frozenset(self._excluded_joins.items()))
+
+    def _clear_indexes(self):
+        "Clears the indexes and caches derived from the nodes."
         # cache all app names relative to their model names i.e. supporting
         # multiple apps with models of the same name
         self._model_apps = MultiValueDict({})
@@ -296,7 +403,15 @@ class ModelTree(object):
         # cache (app, model) pairs with the respective model class
         self._models = {}
 
-        self._build()
+        # cache model names with the respective model class or `False` if
+        # the name is shared by models of multiple apps
+        self._model_names = {}
+
+        # cache the joins of each node relative to their models
+        self._node_joins = {}
+
+        # cache the lookups of fields relative to their models and names
+        self._field_lookups = {}
 
     def __repr__(self):
         return u'<ModelTree for {0}>'.format(self.root_model.__name__)
@@ -408,6 +523,40 @@ class ModelTree(object):
             model = self.root_model
         return model._meta.get_field(name)
 
+    def _find_local_model(self, model_name, app_name=None):
+        """Returns the model of this tree for `model_name` like `get_model`
+        without raising an exception. `None` is returned if no model matches
+        and `False` if the model name is ambiguous.
+        """
+        if not (app_name or model_name):
+            return self.root_model
+
+        if '.' in model_name:
+            app_name, model_name = model_name.split('.', 1)
+        model_name = model_name.lower()
+
+        if app_name:
+            return self._models.get((app_name, model_name))
+
+        return self._model_names.get(model_name)
+
+    def _find_field(self, name, model=None):
+        """Returns the field `name` like `get_field` or `None` if it does not
+        exist, without raising an exception.
+        """
+        if model is None:
+            model = self.root_model
+
+        opts = model._meta
+
+        # These are the indexes `Options.get_field` looks the name up in
+        field = opts._forward_fields_map.get(name)
+
+        if field is None:
+            field = opts.fields_map.get(name)
+
+        return field
+
     def _build_routes(self, routes, allow_redundant_targets=True):
         """Routes provide a means of specifying JOINs between two tables.
 
@@ -487,6 +636,16 @@ class ModelTree(object):
         """Checks if the join between `source` and `target` via `field`
         is allowed.
         """
+        # Never go back through the root
+        if target == self.root_model:
+            return False
+
+        return self._route_allowed(source, target, field)
+
+    def _route_allowed(self, source, target, field=None):
+        """Checks if the join between `source` and `target` via `field` is
+        allowed by the rules, regardless of the root model.
+        """
         join = (source, target)
 
         # No circles
@@ -497,10 +656,6 @@ class ModelTree(object):
         if target in self.excluded_models:
             return False
 
-        # Never go back through the root
-        if target == self.root_model:
-            return False
-
         # Apply excluded joins if any
         if join in self._excluded_joins:
             _field = self._excluded_joins[join]
@@ -510,23 +665,25 @@ class ModelTree(object):
                 return False
 
         # Check if the join is allowed by a required rule
-        for (_source, _target), _field in self._required_joins.items():
-            if _target == target:
-                if _source != source:
-                    return False
+        if target in self._required_targets:
+            _source, _field = self._required_targets[target]
 
-                # If a field is supplied, check to see if the field is allowed
-                # for this join.
-                if field and _field and _field != field:
-                    return False
+            if _source != source:
+                return False
+
+            # If a field is supplied, check to see if the field is allowed
+            # for this join.
+            if field and _field and _field != field:
+                return False
 
         return True
 
     def _add_node(self, parent, model, relation, reverse, related_name,
                   accessor_name, nullable, depth):
         """Adds a node to the tree only if a node of the same `model' does not
-        already exist in the tree with smaller depth. If the node is added, the
-        tree traversal continues finding the node's relations.
+        already exist in the tree. Since the tree is built breadth-first, the
+        first node added for a model is always the one with the smallest
+        depth. Returns the new node or `None` if it was not added.
 
         Conditions in which the node will fail to be added:
 
@@ -540,112 +697,345 @@ class ModelTree(object):
         if reverse and '+' in related_name:
             return
 
-        node_hash = self._nodes.get(model, None)
+        # don't add node if a path with a shorter or equal depth exists. the
+        # breadth-first traversal guarantees the existing node is either
+        # shallower or was reached first at the same depth. generally if a
+        # route is defined for relation, this will never be an issue since
+        # there would only be one path available. if a route is not defined,
+        # the shorter path will be found
+        if model in self._nodes:
+            return
 
-        # don't add node if a path with a shorter depth exists. this is applied
-        # after the correct join has been determined. generally if a route is
-        # defined for relation, this will never be an issue since there would
-        # only be one path available. if a route is not defined, the shorter
-        # path will be found
-        if not node_hash or node_hash['depth'] > depth:
-            if node_hash:
-                node_hash['parent'].remove_child(model)
+        node = ModelTreeNode(model, parent, relation, reverse,
+                             related_name, accessor_name, nullable, depth)
 
-            node = ModelTreeNode(model, parent, relation, reverse,
-                                 related_name, accessor_name, nullable, depth)
+        # the path and query string are derived from the parent's which are
+        # always indexed first
+        parent_hash = self._nodes[parent.model]
+        query_string = parent_hash['query_string']
 
-            self._nodes[model] = {
-                'parent': parent,
-                'depth': depth,
-                'node': node,
-            }
+        if query_string:
+            query_string = '__'.join((query_string, related_name))
+        else:
+            query_string = related_name
+
+        self._nodes[model] = {
+            'parent': parent,
+            'depth': depth,
+            'node': node,
+            'path': parent_hash['path'] + (node,),
+            'query_string': str(query_string),
+        }
 
-            node = self._find_relations(node, depth)
-            parent.children.append(node)
-
-    def _find_relations(self, node, depth=0):
-        """Finds all relations given a node."""
-        depth += 1
-
-        model = node.model
-
-        # NOTE: the many-to-many relations are evaluated first to prevent
-        # 'through' models being bound as a ForeignKey relationship.
-        fields = sorted(model._meta.get_fields(), reverse=True,
-                        key=lambda f: f.many_to_many)
-
-        # determine relational fields to determine paths
-        forward_fields = [
-            f for f in fields
-            if (f.one_to_one or f.many_to_many or f.many_to_one)
-            and (f.concrete or not f.auto_created)
-            and f.rel is not None  # Generic foreign keys do not define rel.
-            and self._join_allowed(f.model, f.rel.to, f)
-        ]
-        reverse_fields = [
-            f for f in fields
-            if (f.one_to_many or f.one_to_one or f.many_to_many)
-            and (not f.concrete and f.auto_created)
-            and self._join_allowed(f.model, f.related_model, f.field)
-        ]
-
-        def get_relation_type(f):
-            if f.one_to_one:
-                return 'onetone'
-            elif f.many_to_many:
-                return 'manytomany'
-            elif f.one_to_many or f.many_to_one:
-                return 'foreignkey'
-
-        # Iterate over forward relations
-        for f in forward_fields:
-            null = f.many_to_many or f.null
-            kwargs = {
-                'parent': node,
-                'model': f.rel.to,
-                'relation': get_relation_type(f),
-                'reverse': False,
-                'related_name': f.name,
-                'accessor_name': f.name,
-                'nullable': null,
-                'depth': depth,
-            }
-            self._add_node(**kwargs)
+        parent.children.append(node)
+
+        return node
+
+    def _get_allowed_relations(self, model):
+        """Returns the relations of `model` allowed by the rules of the tree
+        as a tuple of `graph.Relation`s."""
+        relations = self._relations.get(model)
+
+        if relations is None:
+            # The relations of each model are shared by all trees, only the
+            # routes of this tree are applied. Reverse relations blocked via
+            # the '+' can never be added.
+            relations = tuple(r for r in graph.get_relations(model)
+                              if self._route_allowed(*r.join) and
+                              not (r.reverse and '+' in r.related_name))
 
-        # Iterate over reverse relations.
-        for r in reverse_fields:
-            kwargs = {
+            self._relations[model] = relations
+
+        return relations
+
+    @instrument('find_relations')
+    def _find_relations(self, node):
+        """Returns the relations of a node to models not yet in the tree as
+        a list of keyword arguments for `_add_node`, in the order they are
+        traversed."""
+        depth = node.depth + 1
+        nodes = self._nodes
+        root_model = self.root_model
+
+        relations = []
+
+        for r in self._get_allowed_relations(node.model):
+            if r.model in nodes or r.model is root_model:
+                continue
+
+            relations.append({
                 'parent': node,
-                'model': r.related_model,
-                'relation': get_relation_type(r),
-                'reverse': True,
-                'related_name': r.field.related_query_name(),
-                'accessor_name': r.get_accessor_name(),
-                'nullable': True,
+                'model': r.model,
+                'relation': r.relation,
+                'reverse': r.reverse,
+                'related_name': r.related_name,
+                'accessor_name': r.accessor_name,
+                'nullable': r.nullable,
                 'depth': depth,
-            }
-            self._add_node(**kwargs)
+            })
 
-        return node
+        return relations
 
-    def _build(self):
-        node = ModelTreeNode(self.root_model)
-        self._root_node = self._find_relations(node)
+    def _add_root_node(self):
+        self._root_node = ModelTreeNode(self.root_model)
 
         self._nodes[self.root_model] = {
             'parent': None,
             'depth': 0,
             'node': self._root_node,
+            'path': (),
+            'query_string': '',
         }
 
-        # store local cache of all models in this tree by name
+    def _index_models(self):
+        """Stores a local cache of all models in this tree by name. The
+        indexes are expected to have been cleared."""
+        model_apps = {}
+
         for model in self._nodes:
             model_name = model._meta.object_name.lower()
             app_name = model._meta.app_label
 
-            self._model_apps.appendlist(model_name, app_name)
+            model_apps.setdefault(model_name, []).append(app_name)
             self._models[(app_name, model_name)] = model
 
+            if model_name in self._model_names:
+                self._model_names[model_name] = False
+            else:
+                self._model_names[model_name] = model
+
+        self._model_apps = MultiValueDict(model_apps)
+
+    @instrument('build')
+    def _build(self):
+        """Builds the tree breadth-first from the root model.
+
+        Each model is visited exactly once, at the smallest depth it can be
+        reached, so no subtree ever has to be discarded and rebuilt. Ties
+        between paths of equal depth are resolved in favor of the path that
+        is traversed first. The traversal is iterative, so the depth of the
+        schema is not bound by the recursion limit.
+        """
+        self._add_root_node()
+        self._extend([self._root_node])
+        self._index_models()
+
+    def _extend(self, nodes):
+        """Continues the breadth-first traversal from `nodes`, which must be
+        the deepest level of the tree in the order they were added."""
+        queue = deque(nodes)
+
+        while queue:
+            node = queue.popleft()
+
+            for kwargs in self._find_relations(node):
+                child = self._add_node(**kwargs)
+
+                if child is not None:
+                    queue.append(child)
+
+    def _restore(self, nodes):
+        """Restores the nodes of a serialized tree rather than traversing
+        the models. See `serialize()` for the format of `nodes`.
+        """
+        self._add_root_node()
+
+        restored = [self._root_node]
+
+        for label, parent, relation, reverse, related_name, accessor_name, \
+                nullable in nodes:
+            parent = restored[parent]
+
+            restored.append(self._add_node(
+                parent, self.get_model(label, local=False), relation,
+                reverse, related_name, accessor_name, nullable,
+                parent.depth + 1))
+
+        self._index_models()
+
+    def update(self, excluded_models=None, required_routes=None,
+               excluded_routes=None):
+        """Updates the excluded models and routes of this tree in place. Each
+        argument that is supplied replaces the current setting, see the
+        class docstring for the format.
+
+        Only the part of the tree affected by the change is rebuilt. Since
+        the tree is built breadth-first, all levels above the shallowest node
+        having a relation to a model whose rules changed are kept as is and
+        the traversal is resumed from there. The result is identical to
+        building a new tree with the same settings.
+
+        Note that the tree is modified in place, so it must not be used
+        concurrently while it is being updated.
+        """
+        if excluded_models is None:
+            excluded_models = self.excluded_models
+        else:
+            excluded_models = [self.get_model(label, local=False)
+                               for label in excluded_models]
+
+        if required_routes is None:
+            required_joins = self._required_joins
+        else:
+            required_joins = self._build_routes(required_routes,
+                                                allow_redundant_targets=False)
+
+        if excluded_routes is None:
+            excluded_joins = self._excluded_joins
+        else:
+            excluded_joins = self._build_routes(excluded_routes)
+
+        previous = (self.excluded_models, self._required_targets,
+                    self._excluded_joins)
+
+        self._set_rules(excluded_models, required_joins, excluded_joins)
+
+        depth = self._affected_depth(self._changed_targets(*previous))
+
+        if depth is not None:
+            self._rebuild(depth)
+
+        tree_updated.send(sender=self.__class__, alias=self.alias, tree=self)
+
+    def _changed_targets(self, excluded_models, required_targets,
+                         excluded_joins):
+        """Returns the models for which the joins allowed by the previous
+        rules differ from the current ones. Whether a join is allowed only
+        depends on the rules for its target, see `_join_allowed`.
+        """
+        changed = excluded_models ^ self.excluded_models
+
+        for target in set(required_targets) | set(self._required_targets):
+            if required_targets.get(target) != \
+                    self._required_targets.get(target):
+                changed.add(target)
+
+        for join in set(excluded_joins) | set(self._excluded_joins):
+            if (join in excluded_joins) != (join in self._excluded_joins) or \
+                    excluded_joins.get(join) != self._excluded_joins.get(join):
+                changed.add(join[1])
+
+        return changed
+
+    def _affected_depth(self, targets):
+        """Returns the depth of the shallowest node having a relation to one
+        of `targets` or `None` if there is none."""
+        depth = None
+
+        if not targets:
+            return depth
+
+        for model, node_hash in self._nodes.items():
+            if depth is not None and node_hash['depth'] >= depth:
+                continue
+
+            for r in graph.get_relations(model):
+                if r.join[1] in targets:
+                    depth = node_hash['depth']
+                    break
+
+        return depth
+
+    def _rebuild(self, depth):
+        "Rebuilds all levels of the tree below `depth`."
+        for model, node_hash in list(self._nodes.items()):
+            if node_hash['depth'] > depth:
+                del self._nodes[model]
+
+        # Collect the nodes at `depth` in the order they were added
+        level = [self._root_node]
+
+        for _ in range(depth):
+            level = [child for node in level for child in node.children]
+
+        for node in level:
+            node.children = []
+
+        self._extend(level)
+
+        self._clear_indexes()
+        self._index_models()
+
+    def serialize(self):
+        """Returns a representation of this tree made up of builtin types
+        only, e.g. for storing it as JSON. Models and fields are referenced
+        by their labels. The tree can be restored with `deserialize()`
+        without traversing the models again.
+
+        Nodes are listed breadth-first as lists of the form::
+
+            [model, parent, relation, reverse, related_name, accessor_name,
+             nullable]
+
+        where `parent` is the position of the parent node in the list,
+        offset by one since the root node is implied.
+        """
+        def serialize_joins(joins):
+            return [[_get_model_label(source), _get_model_label(target),
+                     field and _get_model_label(field.model),
+                     field and field.name]
+                    for (source, target), field in joins.items()]
+
+        nodes = []
+        positions = {self.root_model: 0}
+
+        queue = deque(self.root_node.children)
+
+        while queue:
+            node = queue.popleft()
+            positions[node.model] = len(positions)
+
+            nodes.append([
+                _get_model_label(node.model),
+                positions[node.parent_model],
+                node.relation,
+                node.reverse,
+                node.related_name,
+                node.accessor_name,
+                node.nullable,
+            ])
+
+            queue.extend(node.children)
+
+        return {
+            'model': _get_model_label(self.root_model),
+            'alias': self.alias,
+            'excluded_models': sorted(_get_model_label(model)
+                                      for model in self.excluded_models),
+            'required_joins': serialize_joins(self._required_joins),
+            'excluded_joins': serialize_joins(self._excluded_joins),
+            'nodes': nodes,
+        }
+
+    @classmethod
+    def deserialize(cls, data):
+        "Returns a `ModelTree` restored from the output of `serialize()`."
+        def deserialize_joins(joins):
+            deserialized = {}
+
+            for source, target, field_model, field_name in joins:
+                field = None
+
+                if field_name:
+                    field = get_model(field_model)._meta.get_field(field_name)
+
+                deserialized[(get_model(source), get_model(target))] = field
+
+            return deserialized
+
+        tree = cls.__new__(cls)
+        get_model = partial(tree.get_model, local=False)
+
+        tree.root_model = get_model(data['model'])
+        tree.alias = data['alias']
+
+        tree._setup([get_model(label) for label in data['excluded_models']],
+                    deserialize_joins(data['required_joins']),
+                    deserialize_joins(data['excluded_joins']))
+        tree._restore(data['nodes'])
+
+        return tree
+
     @property
     def root_node(self):
         "Returns the `root_node` and implicitly builds the tree."
@@ -653,22 +1043,26 @@ class ModelTree(object):
             self._build()
         return self._root_node
 
-    def _node_path_to_model(self, model, node, path=[]):
-        "Returns a list representing the path of nodes to the model."
-        if node.model == model:
-            return path
-
-        for child in node.children:
-            mpath = self._node_path_to_model(model, child, path + [child])
-            # TODO why is this condition here?
-            if mpath:
-                return mpath
-
     def _node_path(self, model):
-        "Returns a list of nodes thats defines the path of traversal."
+        "Returns a tuple of nodes thats defines the path of traversal."
         model = self.get_model(model)
-        return self._node_path_to_model(model, self.root_node)
+        return self._nodes[model]['path']
 
+    def _get_node_joins(self, model):
+        """Returns the Join objects that join the node for `model` to its
+        parent. These are built once per node and must not be passed to a
+        query directly, since Django sets the alias and join type on the
+        Join objects it is given.
+        """
+        joins = self._node_joins.get(model)
+
+        if joins is None:
+            joins = tuple(self._nodes[model]['node'].get_joins()[1])
+            self._node_joins[model] = joins
+
+        return joins
+
+    @instrument('get_joins')
     def get_joins(self, model):
         """Returns a list of JOIN connections that can be manually applied to a
         QuerySet object. See `.add_joins()`
@@ -678,20 +1072,21 @@ class ModelTree(object):
         """
         node_path = self._node_path(model)
 
-        joins = []
-        for i, node in enumerate(node_path):
-            # ignore each subsequent first join in the set of joins for a
-            # given model
-            table, path_joins = node.get_joins()
-            if i == 0:
-                joins.append(table)
-            joins.extend(path_joins)
+        if not node_path:
+            return []
+
+        # the join specifications are cached, so only copies are returned
+        joins = [BaseTable(self.root_model._meta.db_table, alias=None)]
+
+        for node in node_path:
+            for join in self._get_node_joins(node.model):
+                joins.append(copy(join))
 
         return joins
 
     def query_string(self, model):
-        nodes = self._node_path(model)
-        return str('__'.join(n.related_name for n in nodes))
+        model = self.get_model(model)
+        return self._nodes[model]['query_string']
 
     def query_string_for_field(self, field, operator=None, model=None):
         """Takes a `models.Field` instance and returns a query string relative
@@ -705,28 +1100,60 @@ class ModelTree(object):
         else:
             model = field.model
 
-        # When an explicit reverse field is used, simply use it directly
-        if isinstance(field, (ManyToManyRel, ManyToOneRel)):
-            toks = [field.field.related_query_name()]
-        else:
-            path = self.query_string(model)
+        # The names of the fields of a model are unique, including those of
+        # reverse fields.
+        key = (model, field.name)
+        lookup = self._field_lookups.get(key)
 
-            if path:
-                toks = [path, field.name]
-            else:
-                toks = [field.name]
+        if lookup is None:
+            lookup = self._field_lookups[key] = \
+                self._get_field_lookup(field, model)
 
         if operator is not None:
-            toks.append(operator)
+            return str('__'.join((lookup, operator)))
+
+        return lookup
+
+    def _get_field_lookup(self, field, model):
+        # The name of a reverse field is the related query name of its
+        # field, so it is relative to the model like any other field.
+        path = self.query_string(model)
+
+        if path:
+            toks = [path, field.name]
+        else:
+            toks = [field.name]
 
         return str('__'.join(toks))
 
+    def get_field_lookups(self):
+        """Returns the lookups of the fields of all models in this tree as
+        a dict of model labels and dicts of field names and lookups, e.g.
+        for building queries on the client side.
+        """
+        lookups = {}
+
+        for model in self._nodes:
+            model_lookups = lookups[_get_model_label(model)] = {}
+
+            for field in model._meta.get_fields():
+                key = (model, field.name)
+
+                if key not in self._field_lookups:
+                    self._field_lookups[key] = \
+                        self._get_field_lookup(field, model)
+
+                model_lookups[field.name] = self._field_lookups[key]
+
+        return lookups
+
     def query_condition(self, field, operator, value, model=None):
         "Conveniece method for constructing a `Q` object for a given field."
         lookup = self.query_string_for_field(field, operator=operator,
                                              model=model)
         return Q(**{lookup: value})
 
+    @instrument('add_joins')
     def add_joins(self, model, queryset=None):
         """Sets up all necessary joins up to the given model on the queryset.
         Returns the alias to the model's database table.
@@ -753,10 +1180,45 @@ class ModelTree(object):
 
         return clone, alias
 
+    def _add_path_joins(self, query, model, aliases):
+        """Sets up the joins up to the given model on the query, skipping the
+        nodes that have already been joined. `aliases` maps the models that
+        have been joined to their table alias and is updated in place.
+        Returns the alias to the model's database table.
+        """
+        alias = aliases.get(model)
+
+        if alias is not None:
+            return alias
+
+        alias = aliases.get(self.root_model)
+
+        if alias is None:
+            alias = query.get_initial_alias()
+            aliases[self.root_model] = alias
+
+        for node in self._node_path(model):
+            if node.model in aliases:
+                alias = aliases[node.model]
+                continue
+
+            for join in self._get_node_joins(node.model):
+                alias = query.join(copy(join))
+
+            aliases[node.model] = alias
+
+        return alias
+
+    @instrument('add_select')
     def add_select(self, *fields, **kwargs):
-        "Replaces the `SELECT` columns with the ones provided."
+        """Replaces the `SELECT` columns with the ones provided.
+
+        The queryset is cloned once and the joins of each node along the
+        paths to the fields' models are applied once, in the order they are
+        first needed.
+        """
         if 'queryset' in kwargs:
-            queryset = kwargs.pop('queryset')
+            queryset = kwargs.pop('queryset')._clone()
         else:
             queryset = self.get_queryset()
 
@@ -766,7 +1228,8 @@ class ModelTree(object):
         if include_pk:
             fields = [self.root_model._meta.pk] + list(fields)
 
-        aliases = []
+        aliases = {}
+        columns = []
 
         for pair in fields:
             if isinstance(pair, (list, tuple)):
@@ -775,12 +1238,13 @@ class ModelTree(object):
                 field = pair
                 model = field.model
 
-            queryset, alias = self.add_joins(model, queryset)
+            alias = self._add_path_joins(queryset.query,
+                                         self.get_model(model), aliases)
 
-            aliases.append(Col(alias, field, field))
+            columns.append(Col(alias, field, field))
 
-        if aliases:
-            queryset.query.select = aliases
+        if columns:
+            queryset.query.select = columns
 
         return queryset
 
@@ -789,13 +1253,59 @@ class ModelTree(object):
         return self.root_model._default_manager.get_queryset()
 
 
+def _setup_process():
+    """Sets up Django in a pool process unless it was forked from a process
+    which has loaded the models. Processes forked while Django is being set
+    up, i.e. when preloading from `AppConfig.ready`, must not set it up,
+    since they inherit the held lock of the app registry.
+    """
+    if not apps.models_ready:
+        import django
+        django.setup()
+
+
+def _build_serialized(args):
+    """Builds the tree for an alias in a pool process and returns the alias,
+    the serialized tree and the time in seconds it took to build."""
+    alias, kwargs = args
+    start = time.time()
+
+    try:
+        data = ModelTree(alias=alias, **kwargs).serialize()
+    except Exception as e:
+        raise ImproperlyConfigured('The modeltree "{0}" could not be '
+                                   'built: {1!r}'.format(alias, e))
+
+    return alias, data, time.time() - start
+
+
 class LazyModelTrees(object):
-    "Lazily evaluates `ModelTree` instances defined in settings."
+    """Lazily evaluates `ModelTree` instances defined in settings.
+
+    Each tree is built at most once, even if it is requested by multiple
+    threads at the same time. While a tree is being built, other threads
+    requesting the same alias wait for it rather than building it again.
+    Once a tree has been built, it is read without any locking.
+
+    `stats` counts the number of trees that were built or loaded from a
+    snapshot and how often a caller had to wait for a tree being built by
+    another thread.
+    """
     def __init__(self, modeltrees):
         self.modeltrees = modeltrees
         self._modeltrees = {}
         self._model_aliases = {}
 
+        # guards the creation of the per-alias locks and the stats
+        self._lock = threading.Lock()
+        self._alias_locks = {}
+
+        self.stats = {
+            'builds': 0,
+            'loads': 0,
+            'waits': 0,
+        }
+
     def __getitem__(self, alias):
         return self._get_or_create(alias)
 
@@ -811,9 +1321,7 @@ class LazyModelTrees(object):
         return True
 
     def _get_model_label(self, model):
-        model_name = model._meta.model_name
-
-        return '{0}.{1}'.format(model._meta.app_label, model_name)
+        return _get_model_label(model)
 
     def _get_or_create(self, alias=None, **kwargs):
         # Echo back an existing modeltree
@@ -842,8 +1350,9 @@ class LazyModelTrees(object):
             kwargs = {'model': model}
 
         # Check if the modeltree is defined after parsing the alias
-        if alias in self._modeltrees:
-            return self._modeltrees[alias]
+        tree = self._modeltrees.get(alias)
+        if tree is not None:
+            return tree
 
         # Override kwargs if settings exists for this alias. If nothing
         # exists, raise an error.
@@ -852,20 +1361,202 @@ class LazyModelTrees(object):
             raise ImproperlyConfigured('No modeltree settings defined '
                                        'for "{0}"'.format(alias))
 
-        return self._create(alias, **kwargs)
+        with self._acquire(alias):
+            # The tree may have been built while waiting for the lock
+            tree = self._modeltrees.get(alias)
+            if tree is not None:
+                return tree
+
+            # Trees defined in settings may have been persisted ahead of time
+            if alias in self.modeltrees:
+                tree = self._load(alias, kwargs)
+
+                if tree is not None:
+                    return tree
+
+            return self._create(alias, **kwargs)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @contextmanager
+    def _acquire(self, alias):
+        "Holds the lock for building the tree for `alias`."
+        with self._lock:
+            lock = self._alias_locks.setdefault(alias, threading.Lock())
+
+        if not lock.acquire(False):
+            self._count('waits')
+            lock.acquire()
+
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def _register(self, alias, tree):
+        # The alias is set on the model first, since the tree is considered
+        # published as soon as it is added.
+        self._model_aliases[tree.root_model] = alias
+        self._modeltrees[alias] = tree
+
+        tree_created.send(sender=self.__class__, alias=alias, tree=tree)
+
+        return tree
+
+    def _load(self, alias, kwargs):
+        "Registers the tree for `alias` from its snapshot if one exists."
+        data = snapshots.read_snapshot(alias, kwargs)
+
+        if data is not None:
+            self._count('loads')
+            return self._register(alias, ModelTree.deserialize(data))
 
     def _create(self, alias, **kwargs):
         tree = ModelTree(alias=alias, **kwargs)
-        self._modeltrees[alias] = tree
-        self._model_aliases[tree.root_model] = alias
-        return self._modeltrees[alias]
+        self._count('builds')
+        return self._register(alias, tree)
 
     def create(self, alias, model=None, **kwargs):
         if inspect.isclass(alias) and issubclass(alias, models.Model):
             model = alias
             alias = self._get_model_label(model)
         kwargs['model'] = model
-        return self._create(alias, **kwargs)
+
+        with self._acquire(alias):
+            return self._create(alias, **kwargs)
+
+    def preload(self, aliases=None, workers=None, processes=False):
+        """Builds the trees for `aliases`, defaulting to all trees defined in
+        settings, using a pool of `workers` threads. Returns a dict of the
+        time in seconds it took to build (or load) each tree.
+
+        Building trees is CPU bound, so threads mostly help while waiting
+        for trees built by others. If `processes` is true, the trees are
+        built in a pool of `workers` processes instead. Each process sends
+        back the serialized tree, see `ModelTree.serialize`, which is
+        deserialized against the models of this process and registered.
+
+        If a tree cannot be built, the remaining trees are not scheduled and
+        an `ImproperlyConfigured` error is raised.
+        """
+        if aliases is None:
+            aliases = list(self.modeltrees)
+
+        if not aliases:
+            return {}
+
+        if processes:
+            return self._preload_processes(aliases, workers)
+
+        def build(alias):
+            start = time.time()
+
+            try:
+                self._get_or_create(alias)
+            except Exception as e:
+                raise ImproperlyConfigured('The modeltree "{0}" could not be '
+                                           'built: {1!r}'.format(alias, e))
+
+            return alias, time.time() - start
+
+        pool = ThreadPool(workers or min(len(aliases), cpu_count()))
+
+        try:
+            return dict(pool.imap_unordered(build, aliases))
+        finally:
+            pool.terminate()
+
+    def _preload_processes(self, aliases, workers):
+        timings = {}
+        pending = []
+
+        # Only the trees which do not exist and have no snapshot are built
+        for alias in aliases:
+            if alias not in self.modeltrees:
+                raise ImproperlyConfigured('No modeltree settings defined '
+                                           'for "{0}"'.format(alias))
+
+            start = time.time()
+
+            with self._acquire(alias):
+                tree = self._modeltrees.get(alias)
+
+                if tree is None:
+                    tree = self._load(alias, self.modeltrees[alias])
+
+            if tree is None:
+                pending.append((alias, self.modeltrees[alias]))
+            else:
+                timings[alias] = time.time() - start
+
+        if not pending:
+            return timings
+
+        pool = Pool(workers or min(len(pending), cpu_count()),
+                    initializer=_setup_process)
+
+        try:
+            for alias, data, seconds in pool.imap_unordered(
+                    _build_serialized, pending):
+                start = time.time()
+                tree = ModelTree.deserialize(data)
+
+                with self._acquire(alias):
+                    # Keep a tree created by another thread in the meantime
+                    if alias not in self._modeltrees:
+                        self._count('builds')
+                        self._register(alias, tree)
+
+                timings[alias] = seconds + time.time() - start
+        finally:
+            pool.terminate()
+
+        return timings
+
+    def build_many(self, aliases=None):
+        """Builds the trees for `aliases`, defaulting to all trees defined in
+        settings, in a single batch, see `ModelTree.build_many`. Trees that
+        already exist or have a snapshot are not built. Returns a dict of
+        the trees by alias.
+        """
+        if aliases is None:
+            aliases = list(self.modeltrees)
+
+        trees = {}
+        pending = []
+
+        for alias in aliases:
+            if alias not in self.modeltrees:
+                raise ImproperlyConfigured('No modeltree settings defined '
+                                           'for "{0}"'.format(alias))
+
+            with self._acquire(alias):
+                tree = self._modeltrees.get(alias)
+
+                if tree is None:
+                    tree = self._load(alias, self.modeltrees[alias])
+
+            if tree is None:
+                pending.append(alias)
+            else:
+                trees[alias] = tree
+
+        built = ModelTree.build_many([dict(self.modeltrees[alias], alias=alias)
+                                      for alias in pending])
+
+        for alias, tree in zip(pending, built):
+            with self._acquire(alias):
+                # Keep a tree created by another thread in the meantime
+                if alias in self._modeltrees:
+                    trees[alias] = self._modeltrees[alias]
+                    continue
+
+                self._count('builds')
+                trees[alias] = self._register(alias, tree)
+
+        return trees
 
     @property
     def default(self):
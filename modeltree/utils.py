@@ -1,10 +1,16 @@
 import sys
+import threading
+from collections import OrderedDict
+from django.conf import settings
 from django.db import models
 from django.db.models import FieldDoesNotExist
 from django.db.models.constants import LOOKUP_SEP
 from django.db.models.sql.constants import QUERY_TERMS
+from django.dispatch import receiver
 from django.utils.termcolors import colorize
-from modeltree.tree import trees, ModelDoesNotExist, ModelNotRelated, \
+from modeltree.instrumentation import instrument
+from modeltree.signals import tree_created, tree_updated
+from modeltree.tree import trees, ModelTree, ModelNotRelated, \
     ModelNotUnique
 
 
@@ -54,6 +60,86 @@ def _resolve(app_name=None, model_name=None, field_name=None, operator=None,
     return lookup
 
 
+class LookupCache(object):
+    """A bounded, least recently used cache of resolved lookups keyed by
+    tree alias and path. Each entry also references the tree the lookup was
+    resolved against, so a lookup is never returned for a different tree
+    with the same alias.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, tree):
+        "Returns the cached lookup for `key` and `tree` or `None`."
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+            if entry is None or entry[0] is not tree:
+                self.misses += 1
+                return
+
+            # Re-insert the entry to mark it as most recently used
+            self._entries[key] = entry
+            self.hits += 1
+
+            return entry[1]
+
+    def set(self, key, tree, lookup):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (tree, lookup)
+
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, alias):
+        "Removes all lookups for the tree `alias`."
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == alias:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        "Returns the hit and miss statistics of the cache."
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'maxsize': self.maxsize,
+                'size': len(self._entries),
+            }
+
+
+lookup_cache = LookupCache(getattr(settings, 'MODELTREE_LOOKUP_CACHE_SIZE',
+                                   1024))
+
+
+@receiver(tree_created)
+@receiver(tree_updated)
+def _invalidate_lookups(sender, alias, **kwargs):
+    lookup_cache.invalidate(alias)
+
+
+def _get_tree(tree):
+    # Querysets pass their tree itself, which does not need to be looked up
+    if isinstance(tree, ModelTree):
+        return tree
+    return trees[tree]
+
+
+@instrument('resolve_lookup')
 def resolve_lookup(path, tree=None):
     """Resolves a model field path and returns a lookup string for use
     with the ``QuerySet`` API.
@@ -72,48 +158,73 @@ def resolve_lookup(path, tree=None):
         'title' => 'employees__title'
         'title__salary' => 'employees__title__salary'
         'title__salary__gt' => 'employees__title__salary__gt'
+
+    Resolved lookups are cached per tree alias and path, see `lookup_cache`.
     """
 
     # No path, nothing to resolve
     if not path:
         raise ValueError('A path must be provided.')
 
-    # Tokenize by the default separator that Django uses
-    toks = path.split(LOOKUP_SEP)
-    num_toks = len(toks)
-
     # If there are more tokens than a fully-qualified modeltree lookup
     # requires, the `path` is assumed to be a normal Django lookup. This is
     # merely a shortcut to prevent unnecessary processing.
-    if num_toks > 4:
+    if path.count(LOOKUP_SEP) > 3:
         return path
 
-    # Starting tokens for full qualified path.
-    app_name = model_name = field_name = operator = None
-
     # Get the `ModelTree` instance these lookups are relative to
-    mtree = trees[tree]
+    mtree = _get_tree(tree)
+
+    key = (mtree.alias, path)
+    lookup = lookup_cache.get(key, mtree)
+
+    if lookup is None:
+        lookup = _resolve_lookup(path, mtree)
+        lookup_cache.set(key, mtree, lookup)
+
+    return lookup
+
+
+def _split_lookup(path):
+    """Splits `path` into its tokens and the trailing field lookup operator,
+    if one is supplied."""
+    # Tokenize by the default separator that Django uses
+    toks = path.split(LOOKUP_SEP)
 
     # Check for a field lookup operator. If it is supplied, a `field_name` must
     # also be specified.
-    if num_toks > 1 and toks[-1] in QUERY_TERMS:
-        operator = toks.pop()
-        num_toks -= 1
+    if len(toks) > 1 and toks[-1] in QUERY_TERMS:
+        return tuple(toks[:-1]), toks[-1]
+
+    return tuple(toks), None
+
+
+def _resolve_tokens(toks, mtree):
+    """Resolves the tokens of a path, excluding the operator, relative to
+    `mtree`. Returns a tuple of the lookup and whether it ends with a field,
+    or `None` if the tokens are not a modeltree lookup.
+    """
+    num_toks = len(toks)
+
+    # Starting tokens for full qualified path.
+    app_name = model_name = field_name = None
 
     # Attempt to infer what the single token is. By default, a local or
     # related field will be checked for, and will fallback to a model name.
     # If neither can be resolved, this is not a valid lookup.
+    #
+    # The tokens are classified using the name tables of the tree, so no
+    # exceptions are raised unless the lookup is invalid.
     if num_toks == 1:
-        # Exception thrown when no field on the modeltree root model is found
-        try:
-            mtree.get_field(toks[0])
+        if mtree._find_field(toks[0]) is not None:
             field_name = toks[0]
-        except FieldDoesNotExist:
+        elif mtree._find_local_model(toks[0]):
+            model_name = toks[0]
+        else:
             # Exception thrown when a related model is not found or the model
             # name is ambiguous.
             try:
                 mtree.get_model(model_name=toks[0])
-                model_name = toks[0]
             except ModelNotRelated:
                 raise InvalidLookup('No field or related model corresponds '
                                     'to "{0}".'.format(model_name))
@@ -125,15 +236,16 @@ def resolve_lookup(path, tree=None):
     # match, this means the first token must be a related field name that
     # spans other relationships.
     elif num_toks == 2:
-        try:
-            mtree.get_model(model_name=toks[0])
+        if mtree._find_local_model(toks[0]):
             model_name, field_name = toks
-        except (ModelNotRelated, ModelNotUnique):
-            try:
-                mtree.get_model(model_name=toks[1])
+        else:
+            model = mtree._find_local_model(toks[1])
+
+            if model:
                 app_name, model_name = toks
-            except (ModelNotRelated, ModelDoesNotExist):
-                pass
+            elif model is False:
+                # Ambiguous model names are an error
+                mtree.get_model(model_name=toks[1])
 
     # Assume all three qualified tokens are supplied
     elif num_toks == 3:
@@ -142,15 +254,76 @@ def resolve_lookup(path, tree=None):
     # Perform a check
     if model_name or field_name:
         try:
-            return _resolve(app_name, model_name, field_name, operator, mtree)
+            lookup = _resolve(app_name, model_name, field_name, None, mtree)
+            return lookup, bool(field_name)
         except (ValueError, FieldDoesNotExist):
             pass
 
+
+def _join_lookup(path, resolved, operator):
+    "Returns the lookup for `path` given its resolved tokens and operator."
     # Fallback to returning the path as is for cross-relation lookups
-    return path
+    if resolved is None:
+        return path
+
+    lookup, field = resolved
+
+    # The operator only applies to lookups of fields, not models
+    if operator is not None and field:
+        return str(LOOKUP_SEP.join((lookup, operator)))
+
+    return lookup
+
+
+def _resolve_lookup(path, mtree):
+    "Resolves `path` relative to `mtree`. See `resolve_lookup`."
+    toks, operator = _split_lookup(path)
+    return _join_lookup(path, _resolve_tokens(toks, mtree), operator)
+
+
+def resolve_lookups(paths, tree=None):
+    """Resolves many model field paths relative to the same tree at once and
+    returns a dict of each path and its lookup string. See `resolve_lookup`.
+
+    The tree is only fetched once and paths are grouped by their tokens, so
+    paths which only differ by their operator, e.g. 'title__salary__gt' and
+    'title__salary__lt', share the resolution of the model and field.
+    Resolved lookups are not added to `lookup_cache`, since a large number
+    of paths would evict the frequently used lookups.
+    """
+    mtree = _get_tree(tree)
+
+    lookups = {}
+    resolved = {}
+
+    for path in paths:
+        if path in lookups:
+            continue
+
+        if not path:
+            raise ValueError('A path must be provided.')
+
+        # See the shortcut in `resolve_lookup`
+        if path.count(LOOKUP_SEP) > 3:
+            lookups[path] = path
+            continue
+
+        toks, operator = _split_lookup(path)
+
+        if toks not in resolved:
+            resolved[toks] = _resolve_tokens(toks, mtree)
+
+        lookups[path] = _join_lookup(path, resolved[toks], operator)
+
+    return lookups
 
 
 class M(models.Q):
+    """A `Q` object whose lookups are resolved relative to the root model of
+    `tree`. The conditions are not grouped by the path they join, since
+    conditions on a multi-valued relation in separate `filter()` calls each
+    need their own join.
+    """
     def __init__(self, tree=None, *args, **kwargs):
         nargs = []
         nkwargs = {}
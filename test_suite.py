@@ -20,4 +20,9 @@ if not apps:
         prefix + 'regressions',
     ]
 
+    # The benchmarks take a while and report their timings, so they only
+    # run when asked for, e.g. `./test_suite.py tests.cases.benchmarks`.
+    if os.environ.get('MODELTREE_BENCHMARKS'):
+        apps.append(prefix + 'benchmarks')
+
 management.call_command('test', *apps)
@@ -0,0 +1,129 @@
+"""Synthetic schemas for benchmarking tree construction.
+
+Models are registered in an isolated app registry so they never leak into
+the project's registry or require database tables.
+"""
+import random
+
+from django.db import models
+from modeltree.bench import create_registry, create_model
+
+
+def create_random_schema(size, fanout=2, seed=0):
+    """Creates `size` randomly related models and returns them in creation
+    order. Each model has up to `fanout` relations to previously created
+    models (foreign keys, one-to-ones and many-to-manys), which produces
+    cycles, diamonds and ambiguous paths once reverse relations are taken
+    into account. Unlike `modeltree.bench.create_schema`, the models are not
+    arranged in levels and include one-to-ones.
+    """
+    registry = create_registry()
+    rand = random.Random(seed)
+    classes = []
+
+    for i in range(size):
+        name = 'Model{0}'.format(i)
+        fields = {}
+
+        for j in range(min(i, fanout)):
+            target = classes[rand.randrange(i)]
+            field_name = 'rel{0}'.format(j)
+            related_name = '{0}_{1}'.format(name.lower(), field_name)
+            kind = rand.random()
+
+            if kind < 0.2:
+                field = models.ManyToManyField(target,
+                                               related_name=related_name)
+            elif kind < 0.3:
+                field = models.OneToOneField(target,
+                                             related_name=related_name)
+            else:
+                field = models.ForeignKey(target, related_name=related_name,
+                                          null=kind < 0.6)
+
+            fields[field_name] = field
+
+        classes.append(create_model(name, registry, fields))
+
+    return classes
+
+
+def create_chain(length):
+    "Creates a linear chain of `length` models related by foreign keys."
+    registry = create_registry()
+    classes = []
+
+    for i in range(length):
+        fields = {}
+
+        if classes:
+            fields['parent'] = models.ForeignKey(classes[-1])
+
+        classes.append(create_model('Link{0}'.format(i), registry, fields))
+
+    return classes
+
+
+def create_large_schema(blocks, seed=0):
+    """Creates `blocks` blocks of five models and returns the models in
+    creation order, so the first model reaches all others.
+
+    Each block is a diamond, B and C relate to A and D relates to both B
+    and C, where D also relates to A through a many-to-many with an
+    explicit through model and B relates to itself. A relates to D, so
+    the relations of a block form a cycle. The A of each block relates to
+    the D of a random previous block, so the depth of the tree grows
+    logarithmically with the number of blocks, and D additionally relates
+    to a random model of any previous block.
+    """
+    registry = create_registry()
+    rand = random.Random(seed)
+    classes = []
+    previous = []
+
+    for i in range(blocks):
+        prefix = 'Block{0}'.format(i)
+        fields = {
+            'd': models.ForeignKey('{0}D'.format(prefix), null=True,
+                                   related_name='a_set'),
+        }
+
+        if previous:
+            fields['previous'] = models.ForeignKey(
+                rand.choice(previous), null=True, related_name='next_set')
+
+        a = create_model(prefix + 'A', registry, fields)
+
+        b = create_model(prefix + 'B', registry, {
+            'a': models.ForeignKey(a, related_name='b_set'),
+            'parent': models.ForeignKey('self', null=True,
+                                        related_name='children'),
+        })
+
+        c = create_model(prefix + 'C', registry, {
+            'a': models.OneToOneField(a, related_name='c'),
+        })
+
+        fields = {
+            'b': models.ForeignKey(b, related_name='d_set'),
+            'c': models.ForeignKey(c, null=True, related_name='d_set'),
+            'members': models.ManyToManyField(
+                a, through='{0}Membership'.format(prefix),
+                related_name='groups'),
+        }
+
+        if classes:
+            fields['other'] = models.ForeignKey(rand.choice(classes),
+                                                null=True, related_name='+')
+
+        d = create_model(prefix + 'D', registry, fields)
+
+        membership = create_model(prefix + 'Membership', registry, {
+            'a': models.ForeignKey(a, related_name='memberships'),
+            'd': models.ForeignKey(d, related_name='memberships'),
+        })
+
+        classes.extend([a, b, c, d, membership])
+        previous.append(d)
+
+    return classes
@@ -0,0 +1,616 @@
+from __future__ import absolute_import
+
+import sys
+
+from django.db.models import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.expressions import Col
+from django.test import SimpleTestCase, TestCase
+from modeltree import graph, utils
+from modeltree.tree import ModelTree, ModelTreeNode, ModelNotRelated, \
+    ModelNotUnique
+from tests import models
+from tests.utils import hierarchy, count_tree_lookups
+from .schema import create_random_schema, create_chain, create_large_schema
+from .utils import best_of, report
+
+
+class RecursiveModelTree(ModelTree):
+    """Reference implementation of the depth-first builder that discards and
+    rebuilds subtrees whenever a shallower path to a model is found."""
+    def _add_node(self, parent, model, relation, reverse, related_name,
+                  accessor_name, nullable, depth):
+        if reverse and '+' in related_name:
+            return
+
+        node_hash = self._nodes.get(model, None)
+
+        if not node_hash or node_hash['depth'] > depth:
+            if node_hash:
+                node_hash['parent'].remove_child(model)
+
+            node = ModelTreeNode(model, parent, relation, reverse,
+                                 related_name, accessor_name, nullable, depth)
+
+            self._nodes[model] = {
+                'parent': parent,
+                'depth': depth,
+                'node': node,
+            }
+
+            self._traverse(node)
+            parent.children.append(node)
+
+    def _traverse(self, node):
+        for r in graph.get_relations(node.model):
+            if self._join_allowed(*r.join):
+                self._add_node(node, r.model, r.relation, r.reverse,
+                               r.related_name, r.accessor_name, r.nullable,
+                               node.depth + 1)
+
+    def _build(self):
+        self._root_node = ModelTreeNode(self.root_model)
+        self._traverse(self._root_node)
+
+
+class DictModelTreeNode(object):
+    "Reference node which stores its attributes in an instance dictionary."
+    __init__ = ModelTreeNode.__init__.__func__
+
+
+def node_size(node):
+    "Returns the size in bytes of a node and its instance dictionary."
+    size = sys.getsizeof(node)
+
+    if hasattr(node, '__dict__'):
+        size += sys.getsizeof(node.__dict__)
+
+    return size
+
+
+def raising_resolve_lookup(path, mtree):
+    """Reference implementation of the lookup resolver which classifies
+    tokens by catching the lookup errors of the tree."""
+    toks = path.split(LOOKUP_SEP)
+    app_name = model_name = field_name = None
+
+    if len(toks) == 1:
+        try:
+            mtree.get_field(toks[0])
+            field_name = toks[0]
+        except FieldDoesNotExist:
+            mtree.get_model(model_name=toks[0])
+            model_name = toks[0]
+
+    elif len(toks) == 2:
+        try:
+            mtree.get_model(model_name=toks[0])
+            model_name, field_name = toks
+        except (ModelNotRelated, ModelNotUnique):
+            try:
+                mtree.get_model(model_name=toks[1])
+                app_name, model_name = toks
+            except ModelNotRelated:
+                pass
+
+    if model_name or field_name:
+        return utils._resolve(app_name, model_name, field_name, None, mtree)
+
+    return path
+
+
+class BuildTestCase(SimpleTestCase):
+    def test_same_hierarchy(self):
+        for seed in range(10):
+            schema = create_random_schema(30, fanout=3, seed=seed)
+
+            for model in schema[::7]:
+                self.assertEqual(
+                    hierarchy(ModelTree(model).root_node),
+                    hierarchy(RecursiveModelTree(model).root_node))
+
+    def test_same_hierarchy_with_routes(self):
+        schema = create_random_schema(30, fanout=3, seed=42)
+
+        kwargs = {
+            'excluded_models': [schema[3]],
+            'excluded_routes': [{
+                'source': schema[1],
+                'target': schema[0],
+            }],
+        }
+
+        self.assertEqual(
+            hierarchy(ModelTree(schema[-1], **kwargs).root_node),
+            hierarchy(RecursiveModelTree(schema[-1], **kwargs).root_node))
+
+    def test_deep_schema(self):
+        "The traversal is not bound by the recursion limit."
+        schema = create_chain(300)
+
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(250)
+
+        try:
+            tree = ModelTree(schema[0])
+        finally:
+            sys.setrecursionlimit(limit)
+
+        self.assertEqual(tree._nodes[schema[-1]]['depth'], len(schema) - 1)
+
+    def test_benchmark(self):
+        rows = []
+
+        for size in (25, 50, 100, 200):
+            schema = create_random_schema(size, fanout=3)
+            root = schema[-1]
+
+            rows.append(('breadth-first, {0} models'.format(size),
+                         best_of(lambda: ModelTree(root))))
+            rows.append(('recursive, {0} models'.format(size),
+                         best_of(lambda: RecursiveModelTree(root))))
+
+        report('Tree build time by schema size', rows)
+
+
+class BuildManyTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "Trees of every model of a schema, sharing the allowed relations."
+        schema = create_large_schema(20)
+        configs = [{'model': model} for model in schema]
+
+        def one_by_one():
+            return [ModelTree(**config) for config in configs]
+
+        def batched():
+            return ModelTree.build_many(configs)
+
+        for tree, other in zip(one_by_one(), batched()):
+            self.assertEqual(hierarchy(tree.root_node),
+                             hierarchy(other.root_node))
+
+        report('Building the trees of all {0} models'.format(len(schema)), [
+            ('one by one', best_of(one_by_one)),
+            ('build_many', best_of(batched)),
+        ])
+
+
+class GraphTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "Building the trees of 40 root models over the same schema."
+        schema = create_random_schema(100, fanout=3)
+        roots = schema[-40:]
+
+        def introspected():
+            for root in roots:
+                graph.clear()
+                ModelTree(root)
+
+        def shared():
+            for root in roots:
+                ModelTree(root)
+
+        report('Building 40 trees over 100 models', [
+            ('introspecting per tree', best_of(introspected)),
+            ('shared relations', best_of(shared)),
+        ])
+
+
+class UpdateTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "Toggling the exclusion of one of the deepest models."
+        schema = create_random_schema(200, fanout=3)
+        tree = ModelTree(schema[-1])
+
+        deepest = max(tree._nodes, key=lambda model: (
+            tree._nodes[model]['depth'], model.__name__))
+
+        def rebuild():
+            ModelTree(schema[-1], excluded_models=[deepest])
+            ModelTree(schema[-1])
+
+        def update():
+            tree.update(excluded_models=[deepest])
+            tree.update(excluded_models=[])
+
+        update()
+        self.assertEqual(hierarchy(tree.root_node),
+                         hierarchy(ModelTree(schema[-1]).root_node))
+
+        report('Toggling an excluded model of 200', [
+            ('new trees', best_of(rebuild, number=5)),
+            ('update', best_of(update, number=5)),
+        ])
+
+
+class JoinsTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "Cached and uncached joins along a six level path."
+        tree = ModelTree(models.A, **{
+            'required_routes': [{
+                'target': 'tests.G',
+                'source': 'tests.H'
+            }],
+            'excluded_routes': [{
+                'target': 'tests.D',
+                'source': 'tests.B',
+            }, {
+                'target': 'tests.F',
+                'source': 'tests.D',
+            }],
+        })
+
+        self.assertEqual(len(tree._node_path(models.H)), 6)
+
+        queryset = tree.get_queryset()
+
+        def uncached():
+            tree._node_joins.clear()
+            tree.add_joins(models.H, queryset)
+
+        def cached():
+            tree.add_joins(models.H, queryset)
+
+        expected = str(tree.add_joins(models.H, queryset)[0].query)
+        self.assertEqual(str(tree.add_joins(models.H, queryset)[0].query),
+                         expected)
+
+        report('add_joins along a six level path', [
+            ('uncached', best_of(uncached, number=200)),
+            ('cached', best_of(cached, number=200)),
+        ])
+
+
+class FieldLookupsTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "Lookups with operators for the fields of all models."
+        schema = create_random_schema(60, fanout=3)
+        tree = ModelTree(schema[-1])
+
+        fields = []
+        for model in tree._nodes:
+            fields.extend(model._meta.get_fields())
+
+        def uncached():
+            tree._field_lookups.clear()
+            for field in fields:
+                tree.query_string_for_field(field, operator='exact')
+
+        def table():
+            for field in fields:
+                tree.query_string_for_field(field, operator='exact')
+
+        report('Lookups of {0} fields'.format(len(fields)), [
+            ('uncached', best_of(uncached, number=20)),
+            ('lookup table', best_of(table, number=20)),
+        ])
+
+
+class SelectTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "Selecting 80 columns from 15 related models."
+        schema = create_random_schema(60, fanout=3)
+        tree = ModelTree(schema[-1])
+
+        # The deepest models in the tree
+        selected = sorted(tree._nodes, key=lambda model: (
+            tree._nodes[model]['depth'], model.__name__))[-15:]
+
+        fields = []
+        while len(fields) < 80:
+            for model in selected:
+                fields.extend(model._meta.concrete_fields)
+        fields = fields[:80]
+
+        def per_field():
+            queryset = tree.get_queryset()
+            queryset.query.default_cols = False
+            columns = []
+
+            for field in [tree.root_model._meta.pk] + fields:
+                queryset, alias = tree.add_joins(field.model, queryset)
+                columns.append(Col(alias, field, field))
+
+            queryset.query.select = columns
+            return queryset
+
+        def batched():
+            return tree.add_select(*fields)
+
+        self.assertEqual(str(batched().query), str(per_field().query))
+
+        report('Selecting 80 columns from 15 models', [
+            ('add_joins per field', best_of(per_field, number=10)),
+            ('add_select', best_of(batched, number=10)),
+        ])
+
+
+class LookupsTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "Resolving uncached lookups of fields, models and related fields."
+        tree = ModelTree(models.Employee)
+
+        paths = [
+            'first_name', 'title', 'office', 'project', 'meeting',
+            'title__salary', 'office__location', 'project__name',
+            'tests__meeting', 'manager__first_name', 'title__name',
+            'office__id',
+        ]
+
+        for path in paths:
+            self.assertEqual(utils._resolve_lookup(path, tree),
+                             raising_resolve_lookup(path, tree))
+
+        def raising():
+            for path in paths:
+                raising_resolve_lookup(path, tree)
+
+        def table():
+            for path in paths:
+                utils._resolve_lookup(path, tree)
+
+        report('Resolving 12 lookups', [
+            ('catching lookup errors', best_of(raising, number=200)),
+            ('name tables', best_of(table, number=200)),
+        ])
+
+
+class BulkLookupsTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "Resolving the fields of every model with several operators."
+        schema = create_random_schema(60, fanout=3)
+        tree = ModelTree(schema[-1])
+
+        paths = []
+
+        for model in tree._nodes:
+            if model is tree.root_model:
+                continue
+
+            for field in model._meta.concrete_fields:
+                path = '{0}__{1}'.format(model._meta.model_name, field.name)
+                paths.append(path)
+
+                for operator in ('exact', 'in', 'isnull', 'gt', 'lt'):
+                    paths.append('{0}__{1}'.format(path, operator))
+
+        def per_path():
+            utils.lookup_cache.clear()
+            return dict((path, utils.resolve_lookup(path, tree))
+                        for path in paths)
+
+        def bulk():
+            return utils.resolve_lookups(paths, tree)
+
+        self.assertEqual(bulk(), per_path())
+
+        report('Resolving {0} lookups'.format(len(paths)), [
+            ('resolve_lookup', best_of(per_path)),
+            ('resolve_lookups', best_of(bulk)),
+        ])
+
+
+class MemoryTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "The size of the nodes of a tree, excluding shared values."
+        schema = create_random_schema(200, fanout=3)
+        tree = ModelTree(schema[-1])
+
+        nodes = [node_hash['node'] for node_hash in tree._nodes.values()]
+        dict_nodes = []
+
+        for node in nodes:
+            dict_nodes.append(DictModelTreeNode(
+                node.model, node.parent, node.relation, node.reverse,
+                node.related_name, node.accessor_name, node.nullable,
+                node.depth))
+
+        slots = sum(node_size(node) for node in nodes) / len(nodes)
+        dicts = sum(node_size(node) for node in dict_nodes) / len(nodes)
+
+        self.assertLess(slots, dicts)
+
+        sys.stderr.write('\nBytes per node of a {0} model tree\n'
+                         '    {1:<30} {2:>10} B\n'
+                         '    {3:<30} {4:>10} B\n'
+                         .format(len(nodes), 'instance dictionary', dicts,
+                                 'slots', slots))
+
+
+class FilterChainTestCase(SimpleTestCase):
+    def test_benchmark(self):
+        "A chain of 20 filters on a tree queryset."
+        def chain():
+            qs = models.Employee.branches.all()
+            for i in range(20):
+                qs = qs.filter(title__salary__gt=i)
+            return qs
+
+        with count_tree_lookups() as calls:
+            chain()
+
+        # Only the initial queryset looks up its tree
+        self.assertEqual(len(calls), 1)
+
+        seconds = best_of(chain, number=20)
+
+        report('A chain of 20 filters', [
+            ('filter chain', seconds),
+        ])
+
+
+def create_employees(size):
+    "Creates `size` employees in the same office and with the same title."
+    office = models.Office.objects.create(location='Outer Space')
+    title = models.Title.objects.create(name='Astronaut', salary=100)
+
+    models.Employee.objects.bulk_create([
+        models.Employee(first_name='Joe', last_name=str(i), title=title,
+                        office=office)
+        for i in range(size)
+    ])
+
+
+class ColumnsTestCase(TestCase):
+    def test_benchmark(self):
+        "Fetching three columns of 20000 rows."
+        create_employees(20000)
+
+        qs = models.Employee.branches.select(
+            models.Office._meta.get_field('location'),
+            models.Title._meta.get_field('salary'))
+
+        def rows():
+            columns = [[], [], []]
+            for row in qs.raw():
+                for i, value in enumerate(row):
+                    columns[i].append(value)
+            return columns
+
+        def columns():
+            return qs.columns()
+
+        self.assertEqual([list(c) for c in columns().values()], rows())
+
+        report('Fetching 3 columns of 20000 rows', [
+            ('rows from raw()', best_of(rows)),
+            ('columns()', best_of(columns)),
+        ])
+
+
+class PagesTestCase(TestCase):
+    def test_benchmark(self):
+        "Paging through 20000 rows 500 at a time."
+        create_employees(20000)
+
+        qs = models.Employee.branches.select(
+            models.Office._meta.get_field('location'),
+            models.Title._meta.get_field('salary')).order_by('id')
+
+        def offset():
+            pages = []
+            for start in range(0, 20000, 500):
+                pages.append(list(qs[start:start + 500].raw()))
+            return pages
+
+        def keyset():
+            return list(qs.pages(page_size=500))
+
+        self.assertEqual(keyset(), offset())
+
+        report('Paging through 20000 rows', [
+            ('offset', best_of(offset)),
+            ('keyset', best_of(keyset)),
+        ])
+
+
+def tree_size(tree):
+    "Returns the size in bytes of the nodes of a tree and their index."
+    size = 0
+
+    for node_hash in tree._nodes.values():
+        size += node_size(node_hash['node'])
+        size += sys.getsizeof(node_hash['node'].children)
+        size += sys.getsizeof(node_hash)
+        size += sys.getsizeof(node_hash['path'])
+
+    return size
+
+
+class CountingModelTree(ModelTree):
+    "Counts the relations it considers and the node joins it looks up."
+    def __init__(self, *args, **kwargs):
+        self.relations = 0
+        self.node_joins = 0
+        super(CountingModelTree, self).__init__(*args, **kwargs)
+
+    def _get_allowed_relations(self, model):
+        relations = super(CountingModelTree, self)\
+            ._get_allowed_relations(model)
+        self.relations += len(relations)
+        return relations
+
+    def _get_node_joins(self, model):
+        self.node_joins += 1
+        return super(CountingModelTree, self)._get_node_joins(model)
+
+
+class ScalingTestCase(SimpleTestCase):
+    """Builds trees of large schemas at increasing sizes and fails if the
+    work grows superlinearly with the number of models. The bounds are
+    generous, growing quadratically would exceed them by a factor of two.
+    Work is counted rather than timed, so the bounds do not depend on the
+    load of the machine.
+    """
+    sizes = (40, 160)
+
+    def assertLinear(self, costs, label):
+        small, large = self.sizes
+        factor = float(large) / small
+        ratio = float(costs[large]) / costs[small]
+
+        self.assertLess(ratio, factor ** 1.5,
+                        '{0} grew {1:.1f}x for {2:.0f}x the models'
+                        .format(label, ratio, factor))
+
+    def test_schema(self):
+        schema = create_large_schema(10)
+        tree = ModelTree(schema[0])
+
+        # All models, including the through models, are reachable once
+        self.assertEqual(len(schema), 50)
+        self.assertEqual(set(tree._nodes), set(schema))
+
+        # Self-references do not add nodes
+        b = schema[1]
+        self.assertEqual(b._meta.get_field('parent').rel.to, b)
+        self.assertEqual([child.model for child in
+                          tree._nodes[b]['node'].children
+                          if child.model is b], [])
+
+    def test_build(self):
+        rows = []
+        costs = {}
+
+        for size in self.sizes:
+            root = create_large_schema(size)[0]
+            costs[size] = CountingModelTree(root).relations
+            rows.append(('{0} models'.format(size * 5),
+                         best_of(lambda: ModelTree(root), repeat=5)))
+
+        report('Tree build time of large schemas', rows)
+        self.assertLinear(costs, 'Relations considered')
+
+    def test_memory(self):
+        costs = {}
+
+        for size in self.sizes:
+            tree = ModelTree(create_large_schema(size)[0])
+            tree.root_node
+            costs[size] = float(tree_size(tree))
+
+        self.assertLinear(costs, 'Memory')
+
+    def test_joins(self):
+        rows = []
+        costs = {}
+
+        for size in self.sizes:
+            schema = create_large_schema(size)
+            tree = CountingModelTree(schema[0])
+
+            def joins():
+                tree._node_joins.clear()
+
+                for model in schema[1:]:
+                    tree.query_string(model)
+                    tree.get_joins(model)
+
+            joins()
+            costs[size] = tree.node_joins
+            rows.append(('{0} models'.format(size * 5),
+                         best_of(joins, repeat=5)))
+
+        report('Query strings and joins of all models of large schemas',
+               rows)
+        self.assertLinear(costs, 'Node joins looked up')
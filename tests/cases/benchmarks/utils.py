@@ -0,0 +1,24 @@
+import sys
+import time
+
+
+def best_of(func, repeat=3, number=1):
+    "Returns the best average time in seconds of `number` calls to `func`."
+    times = []
+
+    for _ in range(repeat):
+        start = time.time()
+        for _ in range(number):
+            func()
+        times.append((time.time() - start) / number)
+
+    return min(times)
+
+
+def report(title, rows):
+    "Writes a small table of (label, seconds) benchmark results to stderr."
+    sys.stderr.write('\n{0}\n'.format(title))
+
+    for label, seconds in rows:
+        sys.stderr.write('    {0:<30} {1:>10.3f} ms\n'
+                         .format(label, seconds * 1000))
@@ -2,3 +2,7 @@ from .test_utils import *  # noqa
 from .test_query import *  # noqa
 from .test_tree import *  # noqa
 from .test_routes import *  # noqa
+from .test_snapshots import *  # noqa
+from .test_graph import *  # noqa
+from .test_instrumentation import *  # noqa
+from .test_bench import *  # noqa
@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import CommandError
+from django.test import TestCase
+from django.utils.six import StringIO
+from modeltree import bench
+from modeltree.management.commands.modeltree import Command
+from modeltree.tree import ModelTree
+
+__all__ = ('BenchTestCase',)
+
+
+class BenchTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def handle(self, *args, **options):
+        stdout = StringIO()
+        Command().handle('bench', *args, stdout=stdout, skip_checks=True,
+                         **options)
+        return stdout.getvalue()
+
+    def test_create_schema(self):
+        schema = bench.create_schema(3, 4, density=1.5, seed=1)
+
+        self.assertEqual(len(schema), 13)
+        self.assertEqual(schema[0].__name__, 'Root')
+
+        # Every model is reachable through its parent
+        tree = ModelTree(schema[0])
+        self.assertEqual(set(tree._nodes), set(schema))
+
+        # Each model has one or two additional relations
+        for model in schema[1:]:
+            names = [f.name for f in model._meta.local_fields +
+                     model._meta.local_many_to_many
+                     if f.name.startswith('rel')]
+            self.assertIn(len(names), (1, 2))
+
+        self.assertEqual([m.__name__ for m in schema],
+                         [m.__name__ for m in bench.create_schema(3, 4)])
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+
+        self.assertEqual(bench.percentile(samples, 50), 50)
+        self.assertEqual(bench.percentile(samples, 99), 99)
+        self.assertEqual(bench.percentile(samples, 100), 100)
+        self.assertEqual(bench.percentile([5], 90), 5)
+
+    def test_benchmark(self):
+        results = bench.benchmark({'model': 'tests.employee'}, repeat=3)
+
+        self.assertEqual(sorted(results),
+                         sorted(bench.OPERATIONS + ('models',)))
+
+        for operation in bench.OPERATIONS:
+            s = results[operation]
+            self.assertTrue(s['min'] <= s['p50'] <= s['p90'] <= s['p99'] <=
+                            s['max'])
+
+    def test_compare(self):
+        results = {'default': {'build': {'p50': 3.0},
+                               'get_joins': {'p50': 1.0}}}
+        baseline = {'default': {'build': {'p50': 2.0},
+                                'get_joins': {'p50': 1.0}},
+                    'other': {'build': {'p50': 1.0}}}
+
+        self.assertEqual(bench.compare(results, baseline),
+                         [('default', 'build', 2.0, 3.0, 1.5)])
+        self.assertEqual(bench.compare(results, baseline, threshold=2), [])
+
+    def test_command(self):
+        path = os.path.join(self.directory, 'baseline.json')
+        output = self.handle('project', repeat=2, save=path)
+
+        self.assertTrue(output.startswith('project ('))
+
+        with open(path) as f:
+            self.assertEqual(list(json.load(f)['results']), ['project'])
+
+        output = self.handle('project', repeat=2, baseline=path,
+                             threshold=1000)
+        self.assertIn('No regressions', output)
+
+    def test_command_regression(self):
+        path = os.path.join(self.directory, 'baseline.json')
+        bench.write_results(path, {'project': dict(
+            (operation, {'p50': 0.0}) for operation in bench.OPERATIONS)})
+
+        self.assertRaises(CommandError, self.handle, 'project', repeat=2,
+                          baseline=path)
+
+    def test_command_synthetic(self):
+        output = self.handle(synthetic=True, width=2, depth=2, repeat=2)
+
+        self.assertTrue(output.startswith(
+            'synthetic(width=2,depth=2,density=0.5,seed=0) (5 models)'))
+
+    def test_command_unknown_alias(self):
+        self.assertRaises(CommandError, self.handle, 'unknown')
@@ -0,0 +1,44 @@
+from django.db.models.signals import class_prepared
+from django.test import TestCase
+from modeltree import graph
+from modeltree.tree import ModelTree
+from tests import models
+
+__all__ = ('GraphTestCase',)
+
+
+class GraphTestCase(TestCase):
+    def test_relations(self):
+        relations = graph.get_relations(models.Employee)
+
+        self.assertEqual(
+            [(r.model, r.related_name, r.reverse) for r in relations], [
+                (models.Title, 'title', False),
+                (models.Office, 'office', False),
+                (models.Employee, 'manager', False),
+                (models.Project, 'project', True),
+                (models.Meeting, 'meeting', True),
+                (models.Employee, 'managed_employees', True),
+            ])
+
+        # Shared rather than introspected again
+        self.assertTrue(graph.get_relations(models.Employee) is relations)
+
+    def test_routes_applied_per_tree(self):
+        tree = ModelTree(models.A, excluded_routes=[{
+            'source': 'tests.B',
+            'target': 'tests.D',
+        }])
+        other = ModelTree(models.A)
+
+        self.assertEqual(tree._node_path(models.D)[0].model, models.C)
+        self.assertEqual(other._node_path(models.D)[0].model, models.B)
+
+    def test_model_prepared(self):
+        relations = graph.get_relations(models.Office)
+
+        # Adding a model may add reverse relations to existing models
+        class_prepared.send(sender=models.Office)
+
+        self.assertFalse(graph.get_relations(models.Office) is relations)
+        self.assertEqual(graph.get_relations(models.Office), relations)
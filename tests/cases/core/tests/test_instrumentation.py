@@ -0,0 +1,82 @@
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+from modeltree import instrumentation
+from modeltree.management.commands.modeltree import Command
+from modeltree.signals import timed
+from modeltree.tree import ModelTree
+from modeltree.utils import resolve_lookup, lookup_cache
+from tests import models
+
+__all__ = ('InstrumentationTestCase',)
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.reset()
+
+    def test_disabled(self):
+        self.assertFalse(instrumentation.is_enabled())
+
+        ModelTree(models.Employee)
+        self.assertEqual(instrumentation.get_stats(), {})
+
+    def test_enabled(self):
+        with override_settings(MODELTREE_INSTRUMENTATION=True):
+            self.assertTrue(instrumentation.is_enabled())
+
+            tree = ModelTree(models.Employee)
+            lookup_cache.clear()
+            resolve_lookup('title__name', tree)
+            tree.add_select(models.Title._meta.get_field('name'))
+            tree.add_joins(models.Title)
+
+        self.assertFalse(instrumentation.is_enabled())
+
+        stats = instrumentation.get_stats()
+
+        self.assertEqual(sorted(stats), ['add_joins', 'add_select', 'build',
+                                         'find_relations', 'get_joins',
+                                         'resolve_lookup'])
+        self.assertEqual(stats['build']['count'], 1)
+        self.assertEqual(stats['find_relations']['count'],
+                         len(tree._nodes))
+
+        for s in stats.values():
+            self.assertTrue(0 <= s['max'] <= s['total'])
+
+    def test_signal(self):
+        calls = []
+
+        def receiver(name, duration, **kwargs):
+            calls.append((name, duration))
+
+        timed.connect(receiver)
+
+        try:
+            with override_settings(MODELTREE_INSTRUMENTATION=True):
+                lookup_cache.clear()
+                resolve_lookup('title__name', 'default')
+        finally:
+            timed.disconnect(receiver)
+
+        self.assertEqual([name for name, duration in calls],
+                         ['resolve_lookup'])
+        self.assertEqual(instrumentation.get_stats()['resolve_lookup']
+                         ['total'], calls[0][1])
+
+    def test_command(self):
+        stdout = StringIO()
+
+        Command().handle('stats', 'project', stdout=stdout, skip_checks=True)
+
+        self.assertFalse(instrumentation.is_enabled())
+
+        lines = stdout.getvalue().splitlines()
+        names = [line.split()[0] for line in lines[1:-1]]
+
+        self.assertEqual(names, ['build', 'find_relations'])
+        self.assertTrue(lines[-1].startswith('lookup cache:'))
@@ -1,7 +1,12 @@
+from array import array
+
+from django.db import connection
 from django.test import TestCase
+from modeltree import query
 from tests import models
+from tests.utils import count_tree_lookups
 
-__all__ = ('ModelTreeQuerySetTestCase',)
+__all__ = ('ModelTreeQuerySetTestCase', 'StreamTestCase')
 
 
 class ModelTreeQuerySetTestCase(TestCase):
@@ -35,6 +40,31 @@ class ModelTreeQuerySetTestCase(TestCase):
             '("tests_employee"."title_id" = "tests_title"."id") WHERE NOT '
             '("tests_title"."salary" < 50000 )'.replace(' ', ''))
 
+    def test_filter_multivalued(self):
+        # Each filter on a multi-valued relation matches any related row,
+        # so it joins the relation again.
+        qs = models.Employee.branches\
+            .filter(meeting__start_time__year=2020)\
+            .filter(meeting__end_time__year=2020)
+
+        self.assertEqual(str(qs.query).count('JOIN "tests_meeting"'), 2)
+
+        qs = models.Employee.branches.filter(meeting__start_time__year=2020,
+                                             meeting__end_time__year=2020)
+
+        self.assertEqual(str(qs.query).count('JOIN "tests_meeting"'), 1)
+
+    def test_clone_tree(self):
+        qs = models.Employee.branches.all()
+
+        with count_tree_lookups() as calls:
+            for i in range(20):
+                qs = qs.filter(title__salary__gt=i)
+
+        # The tree is passed along rather than looked up again
+        self.assertEqual(calls, [])
+        self.assertTrue(qs.tree is models.Employee.branches.all().tree)
+
     def test_select(self):
         location = models.Office._meta.get_field('location')
         salary = models.Title._meta.get_field('salary')
@@ -60,3 +90,176 @@ class ModelTreeQuerySetTestCase(TestCase):
             '"tests_meeting_attendees"."employee_id") LEFT OUTER JOIN '
             '"tests_meeting" ON ("tests_meeting_attendees"."meeting_id" = '
             '"tests_meeting"."id")'.replace(' ', ''))
+
+
+class StreamTestCase(TestCase):
+    size = 20000
+
+    @classmethod
+    def setUpTestData(cls):
+        office = models.Office.objects.create(location='Outer Space')
+        cls.title = title = models.Title.objects.create(name='Astronaut',
+                                                        salary=100)
+
+        models.Employee.objects.bulk_create([
+            models.Employee(first_name='Joe', last_name=str(i), title=title,
+                            office=office)
+            for i in range(cls.size)
+        ])
+
+    def setUp(self):
+        self.location = models.Office._meta.get_field('location')
+        self.salary = models.Title._meta.get_field('salary')
+
+    def stream(self, queryset, **kwargs):
+        "Streams `queryset` and returns the rows and the sizes of the fetches."
+        fetches = []
+        cursor = connection.cursor
+
+        def tracked():
+            c = cursor()
+            fetchmany = c.fetchmany
+
+            def tracked_fetchmany(size):
+                rows = fetchmany(size)
+                fetches.append(len(rows))
+                return rows
+
+            c.fetchmany = tracked_fetchmany
+            return c
+
+        connection.cursor = tracked
+
+        try:
+            return list(queryset.stream(**kwargs)), fetches
+        finally:
+            del connection.cursor
+
+    def test_stream(self):
+        qs = models.Employee.branches.select(self.location, self.salary)\
+            .order_by('id')
+
+        rows, fetches = self.stream(qs, chunk_size=1000)
+
+        self.assertEqual(len(rows), self.size)
+        self.assertEqual(rows[0][1:], ('Outer Space', 100))
+        self.assertEqual(rows, list(qs.raw()))
+
+        # Rows are fetched a chunk at a time
+        self.assertEqual(fetches, [1000] * 20 + [0])
+
+    def test_named(self):
+        qs = models.Employee.branches.select(self.location, self.salary)\
+            .filter(last_name='1')
+
+        self.assertEqual(qs.column_names(),
+                         ['id', 'office__location', 'title__salary'])
+
+        rows, fetches = self.stream(qs, named=True, server_side=True)
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(sorted(rows[0]),
+                         ['id', 'office__location', 'title__salary'])
+        self.assertEqual(rows[0]['title__salary'], 100)
+
+        rows, fetches = self.stream(models.Employee.branches.filter(
+            last_name='1'), named=True)
+
+        self.assertEqual(rows[0]['last_name'], '1')
+        self.assertEqual(rows[0]['title_id'], self.title.pk)
+
+        # Extra columns are selected before those of `select()`
+        qs = qs.extra(select={'one': '1'})
+
+        self.assertEqual(qs.column_names(),
+                         ['one', 'id', 'office__location', 'title__salary'])
+
+        rows, fetches = self.stream(qs, named=True)
+
+        self.assertEqual(rows[0]['one'], 1)
+        self.assertEqual(rows[0]['title__salary'], 100)
+
+    def test_empty(self):
+        qs = models.Employee.branches.filter(id__in=[])
+        self.assertEqual(list(qs.stream()), [])
+
+    def test_columns(self):
+        qs = models.Employee.branches.select(self.location, self.salary)\
+            .order_by('id')
+        numpy = query.numpy
+        query.numpy = None
+
+        try:
+            columns = qs.columns(chunk_size=1000)
+            other = models.Employee.branches.filter(last_name='1').columns()
+            empty = qs.filter(id__in=[]).columns()
+        finally:
+            query.numpy = numpy
+
+        self.assertEqual(list(columns),
+                         ['id', 'office__location', 'title__salary'])
+        self.assertEqual(columns['id'].typecode, 'l')
+        self.assertEqual(list(columns['id']), [row[0] for row in qs.raw()])
+        self.assertEqual(columns['office__location'],
+                         ['Outer Space'] * self.size)
+        self.assertEqual(columns['title__salary'],
+                         array('l', [100] * self.size))
+
+        # Columns containing nulls cannot be stored in arrays
+        self.assertEqual(other['manager_id'], [None])
+        self.assertEqual(other['title_id'], array('l', [self.title.pk]))
+
+        self.assertEqual(list(empty), list(columns))
+        self.assertEqual(len(empty['id']), 0)
+
+    def test_pages(self):
+        qs = models.Employee.branches.select(self.location, self.salary)\
+            .filter(title__salary__gt=50)
+
+        # One query per page
+        with self.assertNumQueries(20):
+            pages = list(qs.pages(page_size=1000))
+
+        self.assertEqual(len(pages), 20)
+        self.assertEqual(set(len(page) for page in pages), set([1000]))
+        self.assertEqual([row for page in pages for row in page],
+                         list(qs.order_by('id').raw()))
+
+        self.assertEqual(list(qs.filter(title__salary__lt=50).pages()), [])
+
+        # The primary key is only used for paging if it is not selected
+        qs = models.Employee.branches.select(self.location, include_pk=False)
+
+        pages = list(qs.pages(page_size=1000))
+
+        self.assertEqual(len(pages), 20)
+        self.assertEqual(pages[0][0], ('Outer Space',))
+
+    def test_pages_many_to_many(self):
+        employees = list(models.Employee.objects.order_by('id')[:10])
+
+        for name in ('Blue', 'Red'):
+            project = models.Project.objects.create(
+                name=name, manager=employees[0], due_date='2000-01-01')
+            project.employees.add(*employees)
+
+        name = models.Project._meta.get_field('name')
+        qs = models.Employee.branches.select(name)\
+            .filter(id__lte=employees[-1].pk + 5)
+
+        pages = list(qs.pages(page_size=5))
+
+        # Two rows for each of the first ten employees, which are not split
+        # across pages
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 4, 5, 4])
+        self.assertEqual(sorted(row[1] for row in pages[0]),
+                         ['Blue', 'Blue', 'Red', 'Red'])
+        self.assertEqual(set(row[0] for row in pages[1]),
+                         set(e.pk for e in employees[2:4]))
+        self.assertEqual(sorted(row for page in pages for row in page),
+                         sorted(qs.raw()))
+
+        # An instance with more rows than fit in a page gets its own page
+        pages = list(qs.pages(page_size=1))
+
+        self.assertEqual([len(page) for page in pages], [2] * 10 + [1] * 5)
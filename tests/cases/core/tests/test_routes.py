@@ -1,8 +1,11 @@
 from django.test import TestCase
+from modeltree.signals import tree_updated
 from modeltree.tree import ModelTree
+from modeltree.utils import resolve_lookup
 from tests.models import *  # noqa
+from tests.utils import hierarchy
 
-__all__ = ('RouterTestCase', 'FieldRouterTestCase')
+__all__ = ('RouterTestCase', 'FieldRouterTestCase', 'UpdateTestCase')
 
 
 def compare_paths(self, tree, expected_paths):
@@ -108,6 +111,49 @@ class RouterTestCase(TestCase):
 
         compare_paths(self, tree, expected_paths)
 
+    def test_required_symmetrical_excluded_model(self):
+        "D only from C and C only from D, without K"
+
+        kwargs = {
+            'required_routes': [{
+                'target': 'tests.D',
+                'source': 'tests.C',
+                'symmetrical': True,
+            }],
+            'excluded_models': ['tests.K'],
+        }
+
+        tree = ModelTree(A, **kwargs)
+
+        self.assertEqual(tree._required_targets, {D: (C, None),
+                                                  C: (D, None)})
+        self.assertEqual(tree.excluded_models, set([K]))
+
+        self.assertTrue(tree._join_allowed(C, D))
+        self.assertTrue(tree._join_allowed(D, C))
+        self.assertFalse(tree._join_allowed(A, C))
+        self.assertFalse(tree._join_allowed(B, D))
+        self.assertFalse(tree._join_allowed(J, K))
+
+        # C and D can only be reached through each other
+        for model in (C, D, K):
+            self.assertNotIn(model, tree._nodes)
+
+        self.models = [A, B, E, F, G, H, I, J]
+
+        expected_paths = [
+            [],
+            [B],
+            [B, G, H, F, J, E],
+            [B, G, H, F],
+            [B, G],
+            [B, G, H],
+            [B, G, H, I],
+            [B, G, H, F, J],
+        ]
+
+        compare_paths(self, tree, expected_paths)
+
     def test_required_long(self):
         "G from H rather than D or B."
 
@@ -299,3 +345,98 @@ class FieldRouterTestCase(TestCase):
 
         with self.assertRaises(ValueError):
             ModelTree(A, **kwargs)
+
+
+class UpdateTestCase(TestCase):
+    configs = [
+        {},
+        {'excluded_models': ['tests.K']},
+        {'excluded_models': ['tests.D', 'tests.H']},
+        {'required_routes': [{'target': 'tests.D', 'source': 'tests.C'}]},
+        {'required_routes': [{'target': 'tests.G', 'source': 'tests.H'}],
+         'excluded_routes': [{'target': 'tests.D', 'source': 'tests.B'},
+                             {'target': 'tests.F', 'source': 'tests.D'}]},
+        {'required_routes': [{'target': 'tests.E', 'source': 'tests.D',
+                              'field': 'D.e1_set'}]},
+        {'required_routes': [{'target': 'tests.D', 'source': 'tests.C',
+                              'symmetrical': True}],
+         'excluded_models': ['tests.K']},
+        {'excluded_routes': [{'target': 'tests.D', 'source': 'tests.B'},
+                             {'target': 'tests.D', 'source': 'tests.F'}]},
+    ]
+
+    def assertTreesEqual(self, tree, expected):
+        self.assertEqual(hierarchy(tree.root_node),
+                         hierarchy(expected.root_node))
+        self.assertEqual(sorted(tree._nodes), sorted(expected._nodes))
+
+        for model, node_hash in expected._nodes.items():
+            self.assertEqual(tree._nodes[model]['query_string'],
+                             node_hash['query_string'])
+            self.assertEqual([n.model for n in tree._node_path(model)],
+                             [n.model for n in expected._node_path(model)])
+
+        self.assertEqual(tree._models, expected._models)
+        self.assertEqual(tree.excluded_models, expected.excluded_models)
+        self.assertEqual(tree._required_joins, expected._required_joins)
+        self.assertEqual(tree._excluded_joins, expected._excluded_joins)
+
+    def test_same_as_rebuild(self):
+        for config in self.configs:
+            for other in self.configs:
+                tree = ModelTree(A, **config)
+                tree.update(**{
+                    'excluded_models': other.get('excluded_models', ()),
+                    'required_routes': other.get('required_routes', ()),
+                    'excluded_routes': other.get('excluded_routes', ()),
+                })
+
+                self.assertTreesEqual(tree, ModelTree(A, **other))
+
+    def test_partial(self):
+        tree = ModelTree(A, excluded_models=['tests.K'])
+        root = tree.root_node
+        b = tree._nodes[B]['node']
+
+        tree.update(required_routes=self.configs[3]['required_routes'])
+
+        self.assertTreesEqual(tree, ModelTree(A, excluded_models=['tests.K'],
+                                              **self.configs[3]))
+
+        # Levels above the affected relations are kept
+        self.assertTrue(tree.root_node is root)
+        self.assertTrue(tree._nodes[B]['node'] is b)
+
+    def test_invalid(self):
+        tree = ModelTree(A)
+
+        with self.assertRaises(ValueError):
+            tree.update(required_routes=[{
+                'target': 'tests.D',
+                'source': 'tests.C'
+            }, {
+                'target': 'tests.D',
+                'source': 'tests.B'
+            }])
+
+        self.assertTreesEqual(tree, ModelTree(A))
+
+    def test_signal(self):
+        tree = ModelTree(A, alias='update')
+        sent = []
+
+        def receiver(sender, alias, tree, **kwargs):
+            sent.append((alias, tree))
+
+        tree_updated.connect(receiver)
+
+        try:
+            self.assertEqual(resolve_lookup('d', tree), 'b__d')
+            tree.update(excluded_routes=self.configs[7]['excluded_routes'])
+        finally:
+            tree_updated.disconnect(receiver)
+
+        self.assertEqual(sent, [('update', tree)])
+
+        # Previously resolved lookups are invalidated
+        self.assertEqual(resolve_lookup('d', tree), 'c__d')
@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.six import StringIO
+from modeltree import snapshots
+from modeltree.management.commands.modeltree import Command
+from modeltree.tree import ModelTree, LazyModelTrees
+from tests import models
+from tests.utils import hierarchy
+
+__all__ = ('SerializeTestCase', 'SnapshotTestCase')
+
+
+class SerializeTestCase(TestCase):
+    def assertTreesEqual(self, tree, restored):
+        self.assertEqual(hierarchy(restored.root_node),
+                         hierarchy(tree.root_node))
+        self.assertEqual(restored.root_model, tree.root_model)
+        self.assertEqual(restored.alias, tree.alias)
+        self.assertEqual(restored.excluded_models, tree.excluded_models)
+        self.assertEqual(restored._required_joins, tree._required_joins)
+        self.assertEqual(restored._excluded_joins, tree._excluded_joins)
+        self.assertEqual(restored._models, tree._models)
+
+        for model in tree._nodes:
+            self.assertEqual(restored.query_string(model),
+                             tree.query_string(model))
+
+    def test_round_trip(self):
+        for model in (models.Office, models.Employee, models.Project):
+            tree = ModelTree(model, alias='test')
+            data = json.loads(json.dumps(tree.serialize()))
+
+            self.assertTreesEqual(tree, ModelTree.deserialize(data))
+
+    def test_round_trip_routes(self):
+        tree = ModelTree(models.A, **{
+            'required_routes': [{
+                'source': 'tests.D',
+                'target': 'tests.E',
+                'field': 'D.e1_set',
+            }, {
+                'source': 'tests.H',
+                'target': 'tests.G',
+                'symmetrical': True,
+            }],
+            'excluded_routes': [{
+                'source': 'tests.B',
+                'target': 'tests.D',
+            }],
+            'excluded_models': ['tests.K'],
+        })
+
+        data = json.loads(json.dumps(tree.serialize()))
+
+        self.assertTreesEqual(tree, ModelTree.deserialize(data))
+
+
+class SnapshotTestCase(TestCase):
+    modeltrees = {
+        'default': {
+            'model': 'tests.Employee',
+        },
+        'project': {
+            'model': 'tests.Project',
+            'excluded_models': ['tests.Meeting'],
+        },
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, alias):
+        config = self.modeltrees[alias]
+        tree = ModelTree(alias=alias, **config)
+        return snapshots.write_snapshot(alias, config, tree.serialize(),
+                                        directory=self.directory)
+
+    def test_load(self):
+        self.write('project')
+
+        trees = LazyModelTrees(self.modeltrees)
+
+        # Building the tree is skipped entirely
+        build = ModelTree._build
+        ModelTree._build = None
+
+        try:
+            with self.settings(MODELTREE_SNAPSHOT_DIR=self.directory):
+                tree = trees['project']
+        finally:
+            ModelTree._build = build
+
+        self.assertEqual(tree.alias, 'project')
+        self.assertEqual(tree.excluded_models, set([models.Meeting]))
+        self.assertEqual(tree.query_string(models.Title), 'employees__title')
+        self.assertEqual(trees[models.Project], tree)
+
+    def test_mode(self):
+        path = self.write('project')
+
+        umask = os.umask(0)
+        os.umask(umask)
+
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o644 & ~umask)
+
+    def test_fingerprint(self):
+        config = {'model': models.Project, 'key': hierarchy}
+
+        # Classes and functions are identified by their dotted path
+        self.assertEqual(snapshots.get_fingerprint(config),
+                         snapshots.get_fingerprint({
+                             'model': 'tests.project',
+                             'key': 'tests.utils.hierarchy',
+                         }))
+
+        self.assertRaises(TypeError, snapshots.get_fingerprint,
+                          {'model': models.Project, 'key': object()})
+
+    def test_invalid(self):
+        path = self.write('project')
+
+        with open(path, 'w') as f:
+            f.write('{')
+
+        messages = []
+        handler = logging.Handler()
+        handler.emit = messages.append
+        logger = logging.getLogger('modeltree.snapshots')
+        logger.addHandler(handler)
+
+        try:
+            self.assertEqual(
+                snapshots.read_snapshot('project', self.modeltrees['project'],
+                                        directory=self.directory), None)
+        finally:
+            logger.removeHandler(handler)
+
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].levelno, logging.WARNING)
+
+    def test_missing(self):
+        trees = LazyModelTrees(self.modeltrees)
+
+        with self.settings(MODELTREE_SNAPSHOT_DIR=self.directory):
+            self.assertEqual(trees['project'].root_model, models.Project)
+
+    def test_config_changed(self):
+        self.write('project')
+
+        modeltrees = {
+            'project': {
+                'model': 'tests.Project',
+            },
+        }
+
+        self.assertEqual(
+            snapshots.read_snapshot('project', modeltrees['project'],
+                                    directory=self.directory), None)
+
+        trees = LazyModelTrees(modeltrees)
+
+        with self.settings(MODELTREE_SNAPSHOT_DIR=self.directory):
+            self.assertIn(models.Meeting, trees['project']._nodes)
+
+    def test_schema_changed(self):
+        self.write('project')
+
+        fingerprint = snapshots._schema_fingerprint
+        snapshots._schema_fingerprint = 'changed'
+
+        try:
+            self.assertEqual(
+                snapshots.read_snapshot('project', self.modeltrees['project'],
+                                        directory=self.directory), None)
+        finally:
+            snapshots._schema_fingerprint = fingerprint
+
+    def test_command(self):
+        stdout = StringIO()
+
+        with override_settings(MODELTREES=self.modeltrees):
+            Command().handle('snapshot', directory=self.directory,
+                             stdout=stdout, skip_checks=True)
+
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['default.json', 'project.json'])
+
+        for alias, config in self.modeltrees.items():
+            self.assertNotEqual(
+                snapshots.read_snapshot(alias, config,
+                                        directory=self.directory), None)
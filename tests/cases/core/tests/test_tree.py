@@ -1,7 +1,20 @@
+import os
+import pickle
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+from django.apps import apps
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.expressions import Col
 from django.test import TestCase
-from modeltree.tree import trees, LazyModelTrees
+from modeltree import tree as tree_module
+from modeltree.tree import trees, LazyModelTrees, ModelTree
 from tests import models
+from tests.utils import hierarchy
 
 __all__ = ('LazyTreesTestCase', 'ModelTreeTestCase')
 
@@ -23,6 +36,184 @@ class LazyTreesTestCase(TestCase):
         self.assertEqual(len(trees), 1)
         self.assertEqual(trees._model_aliases[models.Employee], 'default')
 
+    def test_concurrent(self):
+        trees = LazyModelTrees(getattr(settings, 'MODELTREES', {}))
+
+        building = threading.Event()
+        create = trees._create
+
+        # Slow down building, so the other threads have to wait for it
+        def _create(alias, **kwargs):
+            building.set()
+            time.sleep(0.05)
+            return create(alias, **kwargs)
+
+        trees._create = _create
+
+        results = []
+
+        def get(alias):
+            results.append((alias, trees[alias]))
+
+        threads = [threading.Thread(target=get, args=('default',))]
+        threads[0].start()
+        building.wait()
+
+        for alias in ['default', 'project'] * 6:
+            threads.append(threading.Thread(target=get, args=(alias,)))
+            threads[-1].start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 13)
+        self.assertEqual(len(set(tree for _, tree in results)), 2)
+
+        for alias, tree in results:
+            self.assertEqual(tree, trees[alias])
+
+        # Each alias was built exactly once
+        self.assertEqual(trees.stats['builds'], 2)
+        self.assertEqual(len(trees), 2)
+        self.assertTrue(trees.stats['waits'] > 0)
+
+    def test_preload(self):
+        trees = LazyModelTrees(getattr(settings, 'MODELTREES', {}))
+
+        timings = trees.preload()
+
+        self.assertEqual(sorted(timings), ['default', 'project'])
+        self.assertEqual(len(trees), 2)
+        self.assertEqual(trees.stats['builds'], 2)
+
+    def test_preload_misconfigured(self):
+        trees = LazyModelTrees({
+            'default': {
+                'model': 'tests.Employee',
+            },
+            'collision': {
+                'model': 'tests.A',
+                'required_routes': [{
+                    'source': 'tests.C',
+                    'target': 'tests.D',
+                }, {
+                    'source': 'tests.B',
+                    'target': 'tests.D',
+                }],
+            },
+        })
+
+        self.assertRaises(ImproperlyConfigured, trees.preload)
+        self.assertRaises(ImproperlyConfigured, trees.preload,
+                          ['collision'], processes=True)
+
+    def test_preload_processes(self):
+        trees = LazyModelTrees(getattr(settings, 'MODELTREES', {}))
+        project = trees['project']
+
+        timings = trees.preload(workers=2, processes=True)
+
+        self.assertEqual(sorted(timings), ['default', 'project'])
+        self.assertEqual(trees.stats['builds'], 2)
+        self.assertEqual(trees['project'], project)
+
+        # The tree is bound to the models of this process
+        tree = trees['default']
+        self.assertTrue(tree.root_model is models.Employee)
+        self.assertEqual(hierarchy(tree.root_node),
+                         hierarchy(ModelTree(models.Employee).root_node))
+
+    def test_preload_processes_on_setup(self):
+        "Preloading in processes while Django is being set up."
+        script = '\n'.join((
+            'import django',
+            'from django.conf import settings',
+            'from tests import settings as test_settings',
+            'options = dict((name, getattr(test_settings, name))',
+            '               for name in dir(test_settings) if name.isupper())',
+            'options.update(MODELTREE_PRELOAD=True,',
+            '               MODELTREE_PRELOAD_PROCESSES=True)',
+            'settings.configure(**options)',
+            'django.setup()',
+            'from modeltree.tree import trees',
+            'print(len(trees))',
+        ))
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(
+            models.__file__)))
+        # The process gets its own group, so its pool can be killed as well
+        process = subprocess.Popen([sys.executable, '-c', script], cwd=root,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   preexec_fn=os.setsid)
+
+        deadline = time.time() + 60
+
+        while process.poll() is None and time.time() < deadline:
+            time.sleep(0.1)
+
+        if process.poll() is None:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+            self.fail('Setting up Django did not finish')
+
+        stdout, stderr = process.communicate()
+
+        self.assertEqual(process.returncode, 0, stderr)
+        self.assertEqual(stdout.strip(), b'2')
+
+    def test_build_many(self):
+        trees = LazyModelTrees(getattr(settings, 'MODELTREES', {}))
+        project = trees['project']
+
+        built = trees.build_many()
+
+        self.assertEqual(sorted(built), ['default', 'project'])
+        self.assertEqual(built['project'], project)
+        self.assertEqual(built['default'], trees['default'])
+        self.assertEqual(trees.stats['builds'], 2)
+
+        self.assertEqual(hierarchy(built['default'].root_node),
+                         hierarchy(ModelTree(models.Employee).root_node))
+
+        self.assertRaises(ImproperlyConfigured, trees.build_many, ['unknown'])
+
+    def test_build_many_shared_relations(self):
+        office, title, restricted = ModelTree.build_many([
+            {'model': models.Office},
+            {'model': models.Title},
+            {'model': models.Title, 'excluded_models': [models.Project]},
+        ])
+
+        self.assertTrue(office._relations is title._relations)
+        self.assertFalse(title._relations is restricted._relations)
+        self.assertTrue(models.Project in office._nodes)
+        self.assertFalse(models.Project in restricted._nodes)
+
+        for tree in (office, title, restricted):
+            self.assertEqual(
+                hierarchy(tree.root_node),
+                hierarchy(ModelTree(tree.root_model,
+                                    excluded_models=tree.excluded_models)
+                          .root_node))
+
+    def test_app_ready(self):
+        config = apps.get_app_config('modeltree')
+        trees = LazyModelTrees(getattr(settings, 'MODELTREES', {}))
+
+        global_trees = tree_module.trees
+        tree_module.trees = trees
+
+        try:
+            config.ready()
+            self.assertEqual(len(trees), 0)
+
+            with self.settings(MODELTREE_PRELOAD=True):
+                config.ready()
+            self.assertEqual(len(trees), 2)
+        finally:
+            tree_module.trees = global_trees
+
 
 class ModelTreeTestCase(TestCase):
     def setUp(self):
@@ -32,6 +223,100 @@ class ModelTreeTestCase(TestCase):
         self.project_mt = trees.create(models.Project)
         self.meeting_mt = trees.create(models.Meeting)
 
+    def test_node_path_index(self):
+        for tree in (self.office_mt, self.title_mt, self.employee_mt,
+                     self.project_mt, self.meeting_mt):
+            for model, node_hash in tree._nodes.items():
+                # Walk the parent references back up to the root
+                path = []
+                node = node_hash['node']
+                while node.parent:
+                    path.insert(0, node)
+                    node = node.parent
+
+                self.assertEqual(list(tree._node_path(model)), path)
+                self.assertEqual(tree.query_string(model),
+                                 '__'.join(n.related_name for n in path))
+
+        self.assertEqual(self.office_mt.query_string(models.Project),
+                         'employee__project')
+        self.assertEqual(self.office_mt.query_string(models.Office), '')
+
+    def test_node_attributes(self):
+        node = self.office_mt._nodes[models.Project]['node']
+
+        self.assertFalse(hasattr(node, '__dict__'))
+        self.assertEqual(node.app_name, 'tests')
+        self.assertEqual(node.model_name, 'Project')
+        self.assertEqual(node.db_table, 'tests_project')
+        self.assertEqual(node.pk_column, 'id')
+        self.assertEqual(node.parent_model, models.Employee)
+        self.assertEqual(node.related_name, 'project')
+        self.assertEqual(node.depth, 2)
+
+        # Names are shared between trees
+        other = self.project_mt.root_node
+        self.assertTrue(node.db_table is other.db_table)
+        self.assertTrue(node.model_name is other.model_name)
+
+        other = pickle.loads(pickle.dumps(node))
+        self.assertEqual(str(other), str(node))
+        self.assertEqual(other.parent.model, models.Employee)
+
+    def test_get_joins_copies(self):
+        joins = self.office_mt.get_joins(models.Project)
+        other = self.office_mt.get_joins(models.Project)
+
+        self.assertEqual(len(joins), 4)
+        # the base table does not support comparison
+        self.assertEqual(joins[1:], other[1:])
+
+        # Django sets the alias and join type on the joins it is given
+        for join, other_join in zip(joins, other):
+            self.assertIsNot(join, other_join)
+
+        self.assertEqual(self.office_mt.get_joins(models.Office), [])
+
+    def test_add_select_per_field(self):
+        "Selecting in one pass results in the same joins as per field."
+        fields = []
+
+        for model in (models.Office, models.Title, models.Employee,
+                      models.Project, models.Meeting):
+            fields.extend(model._meta.concrete_fields)
+
+        for tree in (self.office_mt, self.title_mt, self.employee_mt,
+                     self.project_mt, self.meeting_mt):
+            queryset = tree.get_queryset()
+            queryset.query.default_cols = False
+            columns = []
+
+            for field in [tree.root_model._meta.pk] + fields:
+                queryset, alias = tree.add_joins(field.model, queryset)
+                columns.append(Col(alias, field, field))
+
+            queryset.query.select = columns
+
+            self.assertEqual(str(tree.add_select(*fields).query),
+                             str(queryset.query))
+
+    def test_add_select_queryset(self):
+        queryset = self.employee_mt.get_queryset()
+        name = models.Project._meta.get_field('name')
+
+        selected = self.employee_mt.add_select(name, queryset=queryset,
+                                               include_pk=False)
+
+        self.assertIsNot(selected, queryset)
+        self.assertTrue(queryset.query.default_cols)
+        self.assertEqual(
+            str(selected.query).replace(' ', ''),
+            'SELECT "tests_project"."name" FROM "tests_employee" LEFT OUTER '
+            'JOIN "tests_project_employees" ON ("tests_employee"."id" = '
+            '"tests_project_employees"."employee_id") LEFT OUTER JOIN '
+            '"tests_project" ON ("tests_project_employees"."project_id" = '
+            '"tests_project"."id")'.replace(' ', ''))
+
     def test_get_model(self):
         self.assertEqual(self.employee_mt.get_model('tests.Employee'),
                          models.Employee)
@@ -109,6 +394,57 @@ class ModelTreeTestCase(TestCase):
         qstr = self.meeting_mt.query_string_for_field(start_time)
         self.assertEqual(qstr, 'start_time')
 
+    def test_field_lookups(self):
+        salary = self.office_mt.get_field('salary', models.Title)
+
+        self.assertEqual(
+            self.office_mt.query_string_for_field(salary, operator='gt'),
+            'employee__title__salary__gt')
+        self.assertEqual(self.office_mt._field_lookups,
+                         {(models.Title, 'salary'): 'employee__title__salary'})
+
+        self.assertEqual(str(self.office_mt.query_condition(salary, 'gt', 10)),
+                         "(AND: ('employee__title__salary__gt', 10))")
+
+        lookups = self.office_mt.get_field_lookups()
+
+        self.assertEqual(sorted(lookups), sorted(
+            '{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+            for model in self.office_mt._nodes))
+        self.assertEqual(lookups['tests.title'], {
+            'id': 'employee__title__id',
+            'name': 'employee__title__name',
+            'salary': 'employee__title__salary',
+            'employee': 'employee__title__employee',
+        })
+        self.assertEqual(lookups['tests.office']['location'], 'location')
+        self.assertEqual(lookups['tests.office']['employee'], 'employee')
+
+        # Every lookup can be used to filter the root model
+        for tree in (self.office_mt, self.employee_mt, self.project_mt):
+            for model_lookups in tree.get_field_lookups().values():
+                for lookup in model_lookups.values():
+                    tree.root_model.objects.filter(**{
+                        lookup + '__isnull': True}).count()
+
+        lookups = self.employee_mt.get_field_lookups()
+        self.assertEqual(lookups['tests.office']['employee'],
+                         'office__employee')
+        self.assertEqual(lookups['tests.project']['meeting'],
+                         'project__meeting')
+
+        # Reverse fields below the root have the same lookup in queries
+        meeting = models.Project._meta.get_field('meeting')
+        self.assertEqual(self.employee_mt.query_string_for_field(meeting),
+                         lookups['tests.project']['meeting'])
+        self.assertEqual(
+            str(self.employee_mt.query_condition(meeting, 'isnull', True)),
+            "(AND: ('project__meeting__isnull', True))")
+
+        # Updating the tree clears the lookups
+        self.office_mt.update(excluded_models=['tests.title'])
+        self.assertEqual(self.office_mt._field_lookups, {})
+
     def test_get_join_types(self):
         """
         Django 1.6 decided it likes to put extra whitespace around parens
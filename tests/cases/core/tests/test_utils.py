@@ -1,9 +1,12 @@
 from django.test import TestCase
-from modeltree.utils import resolve_lookup, M, InvalidLookup
+from modeltree.tree import trees
+from modeltree.utils import resolve_lookup, resolve_lookups, M, \
+    InvalidLookup, LookupCache, lookup_cache
 from tests.models import Office, Title, Employee, Project, Meeting
 
 
-__all__ = ('LookupResolverTestCase', 'MTestCase')
+__all__ = ('LookupResolverTestCase', 'BulkLookupResolverTestCase',
+           'LookupCacheTestCase', 'MTestCase')
 
 
 class LookupResolverTestCase(TestCase):
@@ -200,6 +203,77 @@ class LookupResolverTestCase(TestCase):
             self.assertEqual(resolve_lookup(lookup, tree=tree), path)
 
 
+class BulkLookupResolverTestCase(TestCase):
+    def test_same_lookups(self):
+        paths = [
+            'title', 'title__salary', 'title__salary__gt', 'title__salary__lt',
+            'tests__title__salary__in', 'tests__meeting', 'office__isnull',
+            'manager__first_name', 'manager__first_name__iexact',
+            'employees__title__salary__gt__lt',
+        ]
+
+        lookups = resolve_lookups(paths, Project)
+
+        self.assertEqual(lookups, dict((path, resolve_lookup(path, Project))
+                                       for path in paths))
+        self.assertEqual(lookups['title__salary__gt'],
+                         'employees__title__salary__gt')
+
+    def test_invalid(self):
+        self.assertRaises(InvalidLookup, resolve_lookups,
+                          ['title', 'project'], Project)
+        self.assertRaises(ValueError, resolve_lookups, ['title', ''], Project)
+
+
+class LookupCacheTestCase(TestCase):
+    def setUp(self):
+        lookup_cache.clear()
+
+    def test_hits(self):
+        self.assertEqual(resolve_lookup('title__salary', Project),
+                         'employees__title__salary')
+        self.assertEqual(resolve_lookup('title__salary', Project),
+                         'employees__title__salary')
+
+        info = lookup_cache.info()
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['misses'], 1)
+        self.assertEqual(info['size'], 1)
+
+    def test_invalid_not_cached(self):
+        self.assertRaises(InvalidLookup, resolve_lookup, 'project', Project)
+        self.assertEqual(len(lookup_cache), 0)
+
+    def test_create_invalidates(self):
+        resolve_lookup('title__salary', Project)
+        resolve_lookup('location', Office)
+
+        trees.create(Project)
+
+        self.assertEqual(len(lookup_cache), 1)
+        self.assertEqual(resolve_lookup('title__salary', Project),
+                         'employees__title__salary')
+        self.assertEqual(lookup_cache.info()['misses'], 3)
+
+    def test_eviction(self):
+        cache = LookupCache(maxsize=2)
+        tree = trees[Office]
+
+        cache.set(('a', 'x'), tree, 'x')
+        cache.set(('a', 'y'), tree, 'y')
+
+        # Mark 'x' as recently used so 'y' is evicted
+        self.assertEqual(cache.get(('a', 'x'), tree), 'x')
+        cache.set(('a', 'z'), tree, 'z')
+
+        self.assertEqual(cache.get(('a', 'y'), tree), None)
+        self.assertEqual(cache.get(('a', 'x'), tree), 'x')
+        self.assertEqual(cache.get(('a', 'z'), tree), 'z')
+
+        # Lookups of other trees with the same alias are not returned
+        self.assertEqual(cache.get(('a', 'x'), trees[Title]), None)
+
+
 class MTestCase(TestCase):
     def test_variations(self):
         tests = [
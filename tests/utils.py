@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+
+from modeltree.tree import trees
+
+
+def hierarchy(node):
+    "Returns a comparable representation of the subtree at `node`."
+    return (node.model, node.relation, node.reverse, node.related_name,
+            node.accessor_name, node.nullable, node.depth,
+            [hierarchy(child) for child in node.children])
+
+
+@contextmanager
+def count_tree_lookups():
+    """Yields a list of the arguments of each lookup of a tree in the
+    `trees` registry made within the block."""
+    calls = []
+    get_or_create = trees._get_or_create
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return get_or_create(*args, **kwargs)
+
+    trees._get_or_create = counting
+
+    try:
+        yield calls
+    finally:
+        del trees._get_or_create